@@ -1,21 +1,20 @@
 """Contract addresses and configuration"""
 
 import os
-from web3 import Web3
-from dotenv import load_dotenv
 
-load_dotenv()
+# Values below read the environment at import time; the app entry point
+# loads .env before importing this module
 
+# Addresses below are stored in EIP-55 checksum form
+# (check with: python -m gearbox_fork.config)
+CREDIT_MANAGER_V3 = "0xbCd2fFaC58189E57334Bb63253AcbF34D776DE53"
+CREDIT_FACADE_V3 = "0x67bf2a7778edb535A167fF6C959E08d537888118"
 
-CREDIT_MANAGER_V3 = Web3.to_checksum_address(
-    "0xbCd2fFaC58189E57334Bb63253AcbF34D776DE53"
-)
-CREDIT_FACADE_V3 = Web3.to_checksum_address(
-    "0x67bf2a7778edb535A167fF6C959E08d537888118"
-)
+# Multicall3 (same address on mainnet and every fork of it)
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
 
 # Token addresses (checksummed)
-USDC = Web3.to_checksum_address("0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48")
+USDC = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
 
 # RPC URLs
 ANVIL_RPC_URL = os.getenv("ANVIL_RPC_URL", "http://127.0.0.1:8545")
@@ -25,3 +24,16 @@ MAINNET_RPC_URL = os.getenv(
 
 # Default fork block number
 DEFAULT_FORK_BLOCK = 19000000
+
+# Directory for the Streamlit transaction log; unset keeps the log in the
+# session only
+TX_LOG_DIR = os.getenv("GEARBOX_TX_LOG_DIR")
+
+
+if __name__ == "__main__":
+    from web3 import Web3
+
+    for address in (CREDIT_MANAGER_V3, CREDIT_FACADE_V3, MULTICALL3, USDC):
+        if Web3.to_checksum_address(address) != address:
+            raise SystemExit(f"Not checksummed: {address}")
+    print("All addresses are checksummed")
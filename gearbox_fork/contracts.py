@@ -1,25 +1,63 @@
 """Contract ABIs and interaction helpers"""
 
+import functools
 import json
 from pathlib import Path
+from eth_abi import encode as abi_encode
 from web3 import Web3
 from typing import Dict, Any
 
+from .config import CREDIT_FACADE_V3, CREDIT_MANAGER_V3, USDC
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:  # optional, the stdlib parser is fine for a few ABIs
+    _json_loads = json.loads
+
+# ERC20 view selectors, for building raw eth_call / Multicall3 payloads
+BALANCE_OF_SELECTOR = Web3.keccak(text="balanceOf(address)")[:4]
+ALLOWANCE_SELECTOR = Web3.keccak(text="allowance(address,address)")[:4]
+APPROVE_SELECTOR = Web3.keccak(text="approve(address,uint256)")[:4]
+
 # Get the directory where this module is located
 _MODULE_DIR = Path(__file__).parent
 _ABIS_DIR = _MODULE_DIR / "abis"
 
 
+@functools.lru_cache(maxsize=None)
 def load_abi(filename: str) -> list:
-    """Load ABI from JSON file in abis/ directory"""
+    """Load ABI from JSON file in abis/ directory (parsed once per file)"""
     abi_path = _ABIS_DIR / filename
-    if not abi_path.exists():
+    try:
+        with open(abi_path, "rb") as f:
+            return _json_loads(f.read())
+    except FileNotFoundError:
         raise FileNotFoundError(
             f"ABI file not found: {abi_path}. "
             f"Please compile core-v3 contracts and extract ABIs."
-        )
-    with open(abi_path, "r") as f:
-        return json.load(f)
+        ) from None
+
+
+@functools.lru_cache(maxsize=1024)
+def checksum_address(address: str) -> str:
+    """EIP-55 checksum an address, memoized (this app only sees a few addresses)"""
+    return Web3.to_checksum_address(address)
+
+
+def encode_balance_of(account: str) -> bytes:
+    """Calldata for ERC20 balanceOf(account)"""
+    return BALANCE_OF_SELECTOR + abi_encode(["address"], [account])
+
+
+def encode_allowance(owner: str, spender: str) -> bytes:
+    """Calldata for ERC20 allowance(owner, spender)"""
+    return ALLOWANCE_SELECTOR + abi_encode(["address", "address"], [owner, spender])
+
+
+@functools.lru_cache(maxsize=64)
+def encode_approve(spender: str, amount: int) -> bytes:
+    """Calldata for ERC20 approve(spender, amount), memoized (approvals repeat)"""
+    return APPROVE_SELECTOR + abi_encode(["address", "uint256"], [spender, amount])
 
 
 def get_contract(w3: Web3, address: str, abi_filename: str):
@@ -34,26 +72,40 @@ class ContractManager:
     def __init__(self, w3: Web3):
         self.w3 = w3
         self._contracts: Dict[str, Any] = {}
+        # Address-less contract classes, one per ABI; binding an address to a
+        # factory is much cheaper than building a contract from the raw ABI
+        self._factories: Dict[str, Any] = {}
+
+        # Pre-bind the contracts that have a single live address
+        self.credit_facade = self.get_credit_facade(CREDIT_FACADE_V3)
+        self.credit_manager = self.get_credit_manager(CREDIT_MANAGER_V3)
+        self.usdc = self.get_erc20(USDC)
+
+    def _get(self, kind: str, address: str, abi_filename: str):
+        """Get (or bind and cache) a contract instance for an address"""
+        key = f"{kind}_{address}"
+        contract = self._contracts.get(key)
+        if contract is None:
+            factory = self._factories.get(abi_filename)
+            if factory is None:
+                factory = self.w3.eth.contract(abi=load_abi(abi_filename))
+                self._factories[abi_filename] = factory
+            contract = factory(address=address)
+            self._contracts[key] = contract
+        return contract
 
     def get_credit_facade(self, address: str):
         """Get CreditFacadeV3 contract instance"""
-        key = f"credit_facade_{address}"
-        if key not in self._contracts:
-            self._contracts[key] = get_contract(self.w3, address, "CreditFacadeV3.json")
-        return self._contracts[key]
+        return self._get("credit_facade", address, "CreditFacadeV3.json")
 
     def get_credit_manager(self, address: str):
         """Get CreditManagerV3 contract instance"""
-        key = f"credit_manager_{address}"
-        if key not in self._contracts:
-            self._contracts[key] = get_contract(
-                self.w3, address, "CreditManagerV3.json"
-            )
-        return self._contracts[key]
+        return self._get("credit_manager", address, "CreditManagerV3.json")
 
     def get_erc20(self, address: str):
         """Get ERC20 token contract instance"""
-        key = f"erc20_{address}"
-        if key not in self._contracts:
-            self._contracts[key] = get_contract(self.w3, address, "ERC20.json")
-        return self._contracts[key]
+        return self._get("erc20", address, "ERC20.json")
+
+    def get_multicall3(self, address: str):
+        """Get Multicall3 contract instance"""
+        return self._get("multicall3", address, "Multicall3.json")
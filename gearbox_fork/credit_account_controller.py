@@ -9,10 +9,10 @@ This controller provides a clean interface for:
 - Getting account state
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional
 from web3 import Web3
 
-from .contracts import ContractManager
+from .contracts import ContractManager, checksum_address
 from .transactions import (
     prepare_add_collateral,
     prepare_increase_debt,
@@ -23,12 +23,12 @@ from .transactions import (
     execute_open_account,
     simulate_multicall,
     get_account,
-    build_transaction,
+    build_raw_transaction,
     wait_for_tx,
     extract_revert_reason,
 )
 from .state import StateManager, StateStore
-from .config import USDC, CREDIT_MANAGER_V3, CREDIT_FACADE_V3
+from .config import USDC, CREDIT_MANAGER_V3
 
 
 class CreditAccountController:
@@ -39,6 +39,19 @@ class CreditAccountController:
     It handles preparing actions, executing transactions, and managing state.
     """
 
+    # action_type -> preparer(contract_manager, kwargs)
+    _DISPATCH: Dict[str, Callable[[ContractManager, Dict[str, Any]], Any]] = {
+        "add_collateral": lambda cm, kw: prepare_add_collateral(
+            cm, kw.get("token", USDC), kw["amount"]
+        ),
+        "increase_debt": lambda cm, kw: prepare_increase_debt(cm, kw["amount"]),
+        "decrease_debt": lambda cm, kw: prepare_decrease_debt(cm, kw["amount"]),
+        "repay_all_debt": lambda cm, kw: prepare_repay_all_debt(cm),
+        "withdraw_collateral": lambda cm, kw: prepare_withdraw_collateral(
+            cm, kw.get("token", USDC), kw["amount"], kw["to"]
+        ),
+    }
+
     def __init__(
         self,
         w3: Web3,
@@ -58,8 +71,24 @@ class CreditAccountController:
         self.w3 = w3
         self.cm = contract_manager
         self.fork_client = fork_client
-        self.state_manager = StateManager(w3, contract_manager)
+        self.state_manager = StateManager(w3, contract_manager, fork_client)
         self.state_store = state_store or StateStore()
+        # closeCreditAccount(ca, []) calldata per credit account
+        self._close_data: Dict[str, str] = {}
+
+    def _close_calldata(self, credit_facade, credit_account: str, calls) -> str:
+        """closeCreditAccount calldata; the no-calls form is encoded once"""
+        if calls:
+            return credit_facade.encode_abi(
+                "closeCreditAccount", args=[credit_account, calls]
+            )
+        data = self._close_data.get(credit_account)
+        if data is None:
+            data = credit_facade.encode_abi(
+                "closeCreditAccount", args=[credit_account, []]
+            )
+            self._close_data[credit_account] = data
+        return data
 
     def prepare_action(self, action_type: str, **kwargs) -> Dict[str, Any]:
         """
@@ -70,33 +99,17 @@ class CreditAccountController:
                 - "add_collateral" - Add collateral token
                 - "increase_debt" - Borrow funds
                 - "decrease_debt" - Repay debt
+                - "repay_all_debt" - Repay all debt (returns a list of calls)
                 - "withdraw_collateral" - Withdraw collateral
             **kwargs: Action-specific parameters
 
         Returns:
             Dict with "target" and "callData" keys
         """
-        if action_type == "add_collateral":
-            return prepare_add_collateral(
-                self.cm,
-                kwargs.get("token", USDC),
-                kwargs["amount"],
-            )
-        elif action_type == "increase_debt":
-            return prepare_increase_debt(self.cm, kwargs["amount"])
-        elif action_type == "decrease_debt":
-            return prepare_decrease_debt(self.cm, kwargs["amount"])
-        elif action_type == "repay_all_debt":
-            return prepare_repay_all_debt(self.cm)
-        elif action_type == "withdraw_collateral":
-            return prepare_withdraw_collateral(
-                self.cm,
-                kwargs.get("token", USDC),
-                kwargs["amount"],
-                kwargs["to"],
-            )
-        else:
+        preparer = self._DISPATCH.get(action_type)
+        if preparer is None:
             raise ValueError(f"Unknown action type: {action_type}")
+        return preparer(self.cm, kwargs)
 
     def execute_multicall(
         self,
@@ -104,39 +117,43 @@ class CreditAccountController:
         calls: List[Dict[str, Any]],
         account_index: Optional[int] = None,
         private_key: Optional[str] = None,
+        simulate: bool = True,
     ) -> Dict[str, Any]:
         """
         Execute a multicall on an existing credit account.
 
-        Automatically simulates before executing and updates state on success.
+        Simulates before executing (unless simulate=False) and updates state
+        on success.
 
         Args:
             credit_account: Credit account address
             calls: List of prepared calls (from prepare_action)
             account_index: Account index (0-9) or private_key
             private_key: Private key string
+            simulate: If False, skip the pre-flight eth_call (for calls the
+                caller has already validated)
 
         Returns:
             Dict with success, tx_hash, receipt, error
         """
+        account = get_account(account_index, private_key)
 
         # Simulate before executing
-        account = get_account(account_index, private_key)
-        account_address = account.address
-        sim_result = simulate_multicall(
-            self.w3,
-            self.cm,
-            account_address,
-            credit_account,
-            calls,
-        )
+        if simulate:
+            sim_result = simulate_multicall(
+                self.w3,
+                self.cm,
+                account.address,
+                credit_account,
+                calls,
+            )
 
-        if not sim_result.get("success"):
-            return {
-                "success": False,
-                "error": f"Simulation failed: {sim_result.get('error', 'Unknown error')}",
-                "simulation_error": sim_result.get("error"),
-            }
+            if not sim_result.get("success"):
+                return {
+                    "success": False,
+                    "error": f"Simulation failed: {sim_result.get('error', 'Unknown error')}",
+                    "simulation_error": sim_result.get("error"),
+                }
 
         # Execute if simulation succeeds
         result = execute_multicall(
@@ -148,14 +165,16 @@ class CreditAccountController:
             calls=calls,
         )
 
+        if result.get("tx_hash"):
+            # A block was mined whether or not the tx succeeded
+            self.state_manager.state_reader.invalidate()
+
         # Update state on success
         if result.get("success") and self.state_store:
-            account = get_account(account_index, private_key)
-            self.state_manager.update_state(
+            state = self.state_manager.update_state(
                 credit_account,
                 account_address=account.address,
             )
-            state = self.state_manager.get_state(credit_account, refresh=False)
             self.state_store.set_state(credit_account, state.to_dict())
 
         return result
@@ -185,17 +204,19 @@ class CreditAccountController:
             calls=calls or [],
         )
 
+        if result.get("tx_hash"):
+            # A block was mined whether or not the tx succeeded
+            self.state_manager.state_reader.invalidate()
+
         # Update state on success
         if result.get("success") and self.state_store:
             credit_account = result["credit_account"]
             account_address = result["account_address"]
 
-            self.state_manager.update_state(
+            state = self.state_manager.update_state(
                 credit_account,
                 account_address=account_address,
             )
-
-            state = self.state_manager.get_state(credit_account, refresh=False)
             self.state_store.set_state(credit_account, state.to_dict())
             self.state_store.set_credit_account(account_address, credit_account)
 
@@ -218,6 +239,14 @@ class CreditAccountController:
         """
         return self.state_manager.get_state(credit_account, refresh=refresh)
 
+    def mine_blocks(self, count: int = 1) -> dict:
+        """Mine blocks on the fork and drop cached on-chain reads"""
+        if self.fork_client is None:
+            raise ValueError("fork_client is required to mine blocks")
+        result = self.fork_client.mine_blocks(count)
+        self.state_manager.state_reader.invalidate()
+        return result
+
     def close_credit_account(
         self,
         credit_account: str,
@@ -242,24 +271,24 @@ class CreditAccountController:
 
         account = get_account(account_index, private_key)
         account_address = account.address
-        credit_account = self.w3.to_checksum_address(credit_account)
+        credit_account = checksum_address(credit_account)
 
         multicall_calls = calls or []
-        credit_facade = self.cm.get_credit_facade(CREDIT_FACADE_V3)
+        credit_facade = self.cm.credit_facade
 
         try:
-            tx = build_transaction(
+            tx = build_raw_transaction(
                 self.w3,
                 account_address,
-                credit_facade.functions.closeCreditAccount(
-                    credit_account, multicall_calls
-                ),
+                credit_facade.address,
+                self._close_calldata(credit_facade, credit_account, multicall_calls),
                 gas=2000000,
             )
 
             signed_tx = account.sign_transaction(tx)
             tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
             receipt = wait_for_tx(self.w3, tx_hash)
+            self.state_manager.state_reader.invalidate()
 
             if not receipt or receipt.status == 0:
                 revert_reason = extract_revert_reason(self.w3, tx_hash.hex())
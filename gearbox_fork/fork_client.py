@@ -1,26 +1,107 @@
 """Web3 client setup for forked chain"""
 
+import requests
+import threading
+import time
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
 from web3 import Web3
 from typing import Optional
 import os
 
 from .config import ANVIL_RPC_URL
 
+# Number of (kind, address) balances kept by ForkClient
+BALANCE_CACHE_SIZE = 64
+# Seconds a cached block number is trusted, so blocks mined outside this
+# client (other sessions, scripts, an Anvil restart) are picked up too
+BLOCK_CACHE_TTL = 1.5
+
 
 class ForkClient:
     """Client for interacting with Anvil fork"""
 
     def __init__(self, rpc_url: Optional[str] = None):
         self.rpc_url = rpc_url or ANVIL_RPC_URL
-        self.w3 = Web3(Web3.HTTPProvider(self.rpc_url))
+        # One keep-alive session for every RPC from this client, sized for the
+        # UI thread plus background workers (e.g. post-action mining)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=32, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # web3's validation middleware looks up eth_chainId around every
+        # eth_call/tx; the fork's chain id never changes, so cache it
+        self.w3 = Web3(
+            Web3.HTTPProvider(
+                self.rpc_url,
+                session=self.session,
+                cache_allowed_requests=True,
+                cacheable_requests={"eth_chainId"},
+            )
+        )
 
         # Anvil doesn't need PoA middleware
 
         if not self.w3.is_connected():
             raise ConnectionError(f"Failed to connect to {self.rpc_url}")
 
+        # Latest block number, re-read only after something changed the chain.
+        # The lock orders cache updates against mark_block_dirty() from
+        # background workers (e.g. post-action mining)
+        self._block_lock = threading.Lock()
+        self._cached_block: Optional[int] = None
+        self._block_read_at = 0.0
+        self._block_dirty = True
+        # Bumped on every mutation made through this client, including ones
+        # that don't mine a block (e.g. anvil_setBalance)
+        self.state_version = 0
+        # Wallet balances keyed by (kind, address, block, state_version), so
+        # any mutation through this client misses. Shared by StateReader,
+        # WalletManager and the UI so they can't disagree.
+        self._balance_cache: "OrderedDict[tuple, int]" = OrderedDict()
+
+    @property
+    def block_number(self) -> int:
+        """Latest block number, cached until the chain is mutated or for at
+        most BLOCK_CACHE_TTL seconds.
+
+        Methods on this client mark the cache dirty themselves; code that
+        sends transactions through ``w3`` directly must call
+        ``mark_block_dirty()`` afterwards.
+        """
+        with self._block_lock:
+            if (
+                not self._block_dirty
+                and time.monotonic() - self._block_read_at < BLOCK_CACHE_TTL
+            ):
+                return self._cached_block
+            version = self.state_version
+        block = self.w3.eth.block_number
+        with self._block_lock:
+            # A mutation that landed while the read was in flight may not be
+            # reflected in it; leave the cache dirty so the next read retries
+            if self.state_version == version:
+                self._cached_block = block
+                self._block_read_at = time.monotonic()
+                self._block_dirty = False
+        return block
+
+    def mark_block_dirty(self):
+        """Force the next block_number read to query the node"""
+        with self._block_lock:
+            self._block_dirty = True
+            self.state_version += 1
+
+    def bump_state_version(self):
+        """Record a state change that doesn't mine a block (anvil_setBalance,
+        anvil_setStorageAt): cached balances miss, the block number stays"""
+        with self._block_lock:
+            self.state_version += 1
+
     def advance_time(self, seconds: int) -> dict:
         """Advance time by specified seconds"""
+        self.mark_block_dirty()
         return self.w3.provider.make_request("evm_increaseTime", [seconds])
 
     def mine_blocks(self, count: int = 1, interval_seconds: int = 12) -> dict:
@@ -30,25 +111,71 @@ class ForkClient:
         if count <= 0:
             return {}
         # anvil_mine(blocks, interval): both as decimals
-        return self.w3.provider.make_request("anvil_mine", [count, interval_seconds])
+        result = self.w3.provider.make_request("anvil_mine", [count, interval_seconds])
+        # Marked after the request: a block_number read that overlapped the
+        # mine sees the version change and doesn't cache its result
+        self.mark_block_dirty()
+        return result
+
+    def jump_time_and_mine(self, seconds: int) -> dict:
+        """Move the clock forward by seconds and mine a single block there.
+        O(1) on the node no matter how long the interval is."""
+        self.advance_time(seconds)
+        result = self.w3.provider.make_request("evm_mine", [])
+        # advance_time marked the cache before the block existed; a read in
+        # between would otherwise keep the pre-mine block
+        self.mark_block_dirty()
+        return result
 
-    def advance_time_and_mine(self, days: float) -> dict:
-        """Advance chain by mining blocks over ~days (12s per block). Use this
-        for interest accrual; Gearbox accrues per block."""
+    def advance_time_and_mine(self, days: float, strategy: str = "jump") -> dict:
+        """Advance chain by ~days. Gearbox V3 accrues interest from
+        block.timestamp, so by default time is jumped with one block
+        ("jump"); pass strategy="per_block" to mine every 12s block instead."""
         seconds = int(days * 24 * 60 * 60)
+        if strategy == "jump":
+            return self.jump_time_and_mine(max(1, seconds))
+        if strategy != "per_block":
+            raise ValueError(f"Unknown strategy: {strategy}")
         blocks = max(1, seconds // 12)
         return self.mine_blocks(blocks, interval_seconds=12)
 
     def set_balance(self, address: str, balance_wei: int) -> dict:
         """Set balance for an address using anvil_setBalance"""
-        return self.w3.provider.make_request(
+        result = self.w3.provider.make_request(
             "anvil_setBalance", [address, hex(balance_wei)]
         )
+        self.bump_state_version()
+        if "error" not in result:
+            # The new balance is known; don't read it back
+            self.store_balance("eth", address, balance_wei)
+        return result
 
     def get_block_number(self) -> int:
         """Get current block number"""
-        return self.w3.eth.block_number
+        return self.block_number
 
     def get_balance(self, address: str) -> int:
-        """Get ETH balance for an address"""
-        return self.w3.eth.get_balance(address)
+        """Get ETH balance for an address (cached until the fork changes)"""
+        balance = self.cached_balance("eth", address)
+        if balance is None:
+            balance = self.w3.eth.get_balance(address)
+            self.store_balance("eth", address, balance)
+        return balance
+
+    def _balance_key(self, kind: str, address: str) -> tuple:
+        """Cache key for a balance: unchanged until the fork is mutated"""
+        return (kind, address, self.block_number, self.state_version)
+
+    def cached_balance(self, kind: str, address: str) -> Optional[int]:
+        """Cached balance ("eth" or a token name) at the current state, if any"""
+        key = self._balance_key(kind, address)
+        balance = self._balance_cache.get(key)
+        if balance is not None:
+            self._balance_cache.move_to_end(key)
+        return balance
+
+    def store_balance(self, kind: str, address: str, balance: int):
+        """Cache a balance, evicting the least recently used entry when full"""
+        self._balance_cache[self._balance_key(kind, address)] = balance
+        if len(self._balance_cache) > BALANCE_CACHE_SIZE:
+            self._balance_cache.popitem(last=False)
@@ -0,0 +1,55 @@
+"""Multicall3 helpers: run many view calls inside a single eth_call
+
+Multicall3 is deployed at the same address on mainnet (and so on every fork
+of it). Calls are (target, callData) pairs; results come back as raw
+returnData bytes in the same order.
+"""
+
+from typing import List, Sequence, Tuple
+from web3 import Web3
+
+from .config import MULTICALL3
+
+# aggregate3((address target, bool allowFailure, bytes callData)[])
+AGGREGATE3_SELECTOR = Web3.keccak(text="aggregate3((address,bool,bytes)[])")[:4]
+
+Call = Tuple[str, bytes]
+
+
+def encode_aggregate3(w3: Web3, calls: Sequence[Call]) -> bytes:
+    """Encode calldata for Multicall3.aggregate3 (no call may fail)"""
+    return AGGREGATE3_SELECTOR + w3.codec.encode(
+        ["(address,bool,bytes)[]"],
+        [[(target, False, call_data) for target, call_data in calls]],
+    )
+
+
+def decode_aggregate3(w3: Web3, data: bytes) -> List[bytes]:
+    """Decode aggregate3 output into each call's returnData"""
+    (results,) = w3.codec.decode(["(bool,bytes)[]"], data)
+    return [return_data for _, return_data in results]
+
+
+def aggregate3_tx(w3: Web3, calls: Sequence[Call]) -> dict:
+    """eth_call params for aggregating calls (also usable inside a batch)"""
+    return {"to": MULTICALL3, "data": encode_aggregate3(w3, calls)}
+
+
+def aggregate(w3: Web3, calls: Sequence[Call], block="latest") -> List[bytes]:
+    """
+    Execute view calls through Multicall3 in one eth_call
+
+    Args:
+        w3: Web3 instance
+        calls: (target, callData) pairs; callData as bytes or 0x-hex string
+        block: Block identifier to read at
+
+    Returns:
+        returnData bytes for each call, in order
+    """
+    return decode_aggregate3(w3, w3.eth.call(aggregate3_tx(w3, calls), block))
+
+
+def decode_uint256s(w3: Web3, results: Sequence[bytes]) -> List[int]:
+    """Decode returnData values that are each a single uint256"""
+    return [w3.codec.decode(["uint256"], data)[0] for data in results]
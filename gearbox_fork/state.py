@@ -4,24 +4,92 @@ Provides state tracking, reading, and management for UI integration.
 State can be serialized and stored in session (e.g., Streamlit session_state).
 """
 
-from typing import Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass
 from web3 import Web3
 
-from .contracts import ContractManager
+from .contracts import ContractManager, checksum_address, encode_balance_of
+from .multicall import aggregate, aggregate3_tx, decode_aggregate3, decode_uint256s
 from .config import (
     CREDIT_MANAGER_V3,
+    MULTICALL3,
     USDC,
 )
 
 
+# Number of (credit_account, block) summaries kept by StateReader
+SUMMARY_CACHE_SIZE = 64
+
+
 class StateReader:
     """Read and display on-chain state"""
 
-    def __init__(self, w3: Web3, contract_manager: ContractManager):
+    def __init__(
+        self,
+        w3: Web3,
+        contract_manager: ContractManager,
+        fork_client=None,
+        prefetch: bool = False,
+    ):
         self.w3 = w3
         self.cm = contract_manager
+        self.fork_client = fork_client
+        # Warm the node's state cache with eth_createAccessList + eth_getProof
+        # before calcDebtAndCollateral (useful against remote fork nodes)
+        self.prefetch = prefetch
         self.credit_manager = self.cm.get_credit_manager(CREDIT_MANAGER_V3)
+        self.multicall = self.cm.get_multicall3(MULTICALL3)
+        # State is immutable within a block, so summaries are cached per block
+        self._summary_cache: "OrderedDict[Tuple[str, int], Dict[str, Any]]" = (
+            OrderedDict()
+        )
+
+    def invalidate(self):
+        """Drop cached reads (call after sending a tx or mining blocks)"""
+        self._summary_cache.clear()
+        if self.fork_client is not None:
+            self.fork_client.mark_block_dirty()
+
+    def _prefetch_storage(self, tx: Dict[str, Any]):
+        """Ask the node which slots tx touches and load them in one batch.
+
+        Best effort: if the node doesn't support eth_createAccessList or
+        batching, prefetching is turned off and the plain eth_call is used.
+        """
+        try:
+            # make_request returns JSON-RPC errors instead of raising them
+            response = self.w3.provider.make_request(
+                "eth_createAccessList", [tx, "latest"]
+            )
+            if "error" in response:
+                self.prefetch = False
+                return
+            access_list = (response.get("result") or {}).get("accessList") or []
+            if access_list:
+                responses = self.w3.provider.make_batch_request(
+                    [
+                        (
+                            "eth_getProof",
+                            [entry["address"], entry["storageKeys"], "latest"],
+                        )
+                        for entry in access_list
+                    ]
+                )
+                # A rejected batch comes back as a single error response
+                if not isinstance(responses, list) or any(
+                    "error" in r for r in responses
+                ):
+                    self.prefetch = False
+        except Exception:
+            self.prefetch = False
+
+    @property
+    def block_number(self) -> int:
+        """Current block number, cached by the ForkClient when available"""
+        if self.fork_client is not None:
+            return self.fork_client.block_number
+        return self.w3.eth.block_number
 
     def get_account_summary(self, credit_account: str) -> Dict[str, Any]:
         """
@@ -33,68 +101,185 @@ class StateReader:
         Returns:
             Dict with debt, collateral USD, weighted collateral USD, health factor, quoted tokens
         """
-        credit_account = self.w3.to_checksum_address(credit_account)
+        credit_account = checksum_address(credit_account)
+
+        key = (credit_account, self.block_number)
+        cached = self._summary_cache.get(key)
+        if cached is not None:
+            self._summary_cache.move_to_end(key)
+            return cached
+
+        if self.prefetch:
+            self._prefetch_storage(
+                {
+                    "to": self.credit_manager.address,
+                    "data": self.credit_manager.encode_abi(
+                        "calcDebtAndCollateral", args=[credit_account, 3]
+                    ),
+                }
+            )
 
         try:
             # Call calcDebtAndCollateral with task 3 (DEBT_AND_COLLATERAL)
             cdd = self.credit_manager.functions.calcDebtAndCollateral(
                 credit_account, 3
             ).call()
-
-            # Parse results
-            # Based on CollateralDebtData struct:
-            # [0] debt, [1] cumulativeIndexNow, [2] cumulativeIndexLastUpdate,
-            # [3] cumulativeQuotaInterest, [4] accruedInterest, [5] accruedFees,
-            # [6] totalDebtUSD, [7] totalValue, [8] totalValueUSD, [9] twvUSD,
-            # [10] enabledTokensMask, [11] quotedTokensMask, [12] quotedTokens, [13] _poolQuotaKeeper
-            debt = cdd[0]
-            accrued_interest = cdd[4] if len(cdd) > 4 else 0
-            accrued_fees = cdd[5] if len(cdd) > 5 else 0
-            total_debt_usd = cdd[6] if len(cdd) > 6 else 0
-            total_value_usd = cdd[8] if len(cdd) > 8 else 0
-            twv_usd = cdd[9] if len(cdd) > 9 else 0
-            quoted_tokens = cdd[12] if len(cdd) > 12 else []
-
-            # Calculate total debt (principal + interest + fees) in token units
-            total_debt = debt + accrued_interest + accrued_fees
-
-            # Calculate health factor using totalDebtUSD (both in USD with 8 decimals)
-            health_factor = None
-            if total_debt_usd > 0 and twv_usd > 0:
-                health_factor = (twv_usd / total_debt_usd) * 100  # As percentage
-
-            return {
-                "success": True,
-                "credit_account": credit_account,
-                "debt": debt,  # Principal debt
-                "accrued_interest": accrued_interest,
-                "accrued_fees": accrued_fees,
-                "total_debt": total_debt,  # debt + interest + fees
-                "collateral_usd": total_value_usd,
-                "weighted_collateral_usd": twv_usd,
-                "health_factor": health_factor,
-                "quoted_tokens": quoted_tokens,
-            }
+            summary = self._parse_summary(credit_account, cdd)
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+        self._cache_summary(key, summary)
+        return summary
+
+    def _parse_summary(self, credit_account: str, cdd) -> Dict[str, Any]:
+        """Build the summary dict from a CollateralDebtData tuple"""
+        # Parse results
+        # Based on CollateralDebtData struct:
+        # [0] debt, [1] cumulativeIndexNow, [2] cumulativeIndexLastUpdate,
+        # [3] cumulativeQuotaInterest, [4] accruedInterest, [5] accruedFees,
+        # [6] totalDebtUSD, [7] totalValue, [8] totalValueUSD, [9] twvUSD,
+        # [10] enabledTokensMask, [11] quotedTokensMask, [12] quotedTokens, [13] _poolQuotaKeeper
+        debt = cdd[0]
+        accrued_interest = cdd[4] if len(cdd) > 4 else 0
+        accrued_fees = cdd[5] if len(cdd) > 5 else 0
+        total_debt_usd = cdd[6] if len(cdd) > 6 else 0
+        total_value_usd = cdd[8] if len(cdd) > 8 else 0
+        twv_usd = cdd[9] if len(cdd) > 9 else 0
+        quoted_tokens = cdd[12] if len(cdd) > 12 else []
+
+        # Calculate total debt (principal + interest + fees) in token units
+        total_debt = debt + accrued_interest + accrued_fees
+
+        # Calculate health factor using totalDebtUSD (both in USD with 8 decimals)
+        health_factor = None
+        if total_debt_usd > 0 and twv_usd > 0:
+            health_factor = (twv_usd / total_debt_usd) * 100  # As percentage
+
+        return {
+            "success": True,
+            "credit_account": credit_account,
+            "debt": debt,  # Principal debt
+            "accrued_interest": accrued_interest,
+            "accrued_fees": accrued_fees,
+            "total_debt": total_debt,  # debt + interest + fees
+            "collateral_usd": total_value_usd,
+            "weighted_collateral_usd": twv_usd,
+            "health_factor": health_factor,
+            "quoted_tokens": quoted_tokens,
+        }
+
+    def _cache_summary(self, key: Tuple[str, int], summary: Dict[str, Any]):
+        """Store a summary, evicting the least recently used entry when full"""
+        self._summary_cache[key] = summary
+        if len(self._summary_cache) > SUMMARY_CACHE_SIZE:
+            self._summary_cache.popitem(last=False)
+
+    def get_account_view(
+        self, credit_account: str
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Get account summary and credit account balances together
+
+        Both reads go out in a single JSON-RPC batch (one HTTP request). Falls
+        back to separate requests if the provider can't batch or a call fails.
+
+        Args:
+            credit_account: Credit account address
+
+        Returns:
+            (summary, balances) as returned by get_account_summary and
+            get_credit_account_balances
+        """
+        credit_account = checksum_address(credit_account)
+
+        key = (credit_account, self.block_number)
+        if key in self._summary_cache:
+            return (
+                self.get_account_summary(credit_account),
+                self.get_credit_account_balances(credit_account),
+            )
+
+        try:
+            with self.w3.batch_requests() as batch:
+                batch.add(
+                    self.credit_manager.functions.calcDebtAndCollateral(
+                        credit_account, 3
+                    )
+                )
+                batch.add(
+                    self.w3.eth.call(
+                        aggregate3_tx(
+                            self.w3, self._credit_account_balance_calls(credit_account)
+                        )
+                    )
+                )
+                cdd, data = batch.execute()
+            summary = self._parse_summary(credit_account, cdd)
+            (usdc_balance,) = decode_uint256s(
+                self.w3, decode_aggregate3(self.w3, data)
+            )
+        except Exception:
+            return (
+                self.get_account_summary(credit_account),
+                self.get_credit_account_balances(credit_account),
+            )
+
+        self._cache_summary(key, summary)
+        return summary, {"creditAccount": credit_account, "USDC": usdc_balance}
+
+    def _read_uint256s(self, calls: List[Tuple[str, str]]) -> List[int]:
+        """Run (target, callData) view calls through Multicall3 in one eth_call"""
+        return decode_uint256s(self.w3, aggregate(self.w3, calls))
+
+    def _credit_account_balance_calls(self, credit_account: str) -> List[Tuple[str, str]]:
+        """Multicall3 reads for the token balances held by a credit account"""
+        return [(USDC, encode_balance_of(credit_account))]
+
     def get_account_balances(self, account_address: str) -> Dict[str, Any]:
-        """Get all balances for an account"""
-        usdc_contract = self.cm.get_erc20(USDC)
+        """Get all balances for an account
 
+        Uses the fork client's balance cache when there is one, so the
+        wallet manager and this reader see the same values.
+        """
+        fc = self.fork_client
+        if fc is not None:
+            eth_balance = fc.cached_balance("eth", account_address)
+            usdc_balance = fc.cached_balance("usdc", account_address)
+            if eth_balance is not None and usdc_balance is not None:
+                return {
+                    "account": account_address,
+                    "ETH": eth_balance,
+                    "USDC": usdc_balance,
+                }
+
+        eth_balance, usdc_balance = self._read_uint256s(
+            [
+                (
+                    self.multicall.address,
+                    self.multicall.encode_abi("getEthBalance", args=[account_address]),
+                ),
+                (USDC, encode_balance_of(account_address)),
+            ]
+        )
+
+        if fc is not None:
+            fc.store_balance("eth", account_address, eth_balance)
+            fc.store_balance("usdc", account_address, usdc_balance)
         return {
             "account": account_address,
-            "ETH": self.w3.eth.get_balance(account_address),
-            "USDC": usdc_contract.functions.balanceOf(account_address).call(),
+            "ETH": eth_balance,
+            "USDC": usdc_balance,
         }
 
     def get_credit_account_balances(self, credit_account: str) -> Dict[str, Any]:
         """Get token balances in a credit account"""
-        usdc_contract = self.cm.get_erc20(USDC)
+        (usdc_balance,) = self._read_uint256s(
+            self._credit_account_balance_calls(credit_account)
+        )
 
         return {
             "creditAccount": credit_account,
-            "USDC": usdc_contract.functions.balanceOf(credit_account).call(),
+            "USDC": usdc_balance,
         }
 
 
@@ -110,18 +295,31 @@ class AccountState:
     collateral_usd: int = 0
     weighted_collateral_usd: int = 0
     health_factor: Optional[float] = None
-    quoted_tokens: list = None
+    quoted_tokens: tuple = ()
+    timestamp_block: Optional[int] = None  # Block the fields were read at
     
     def __post_init__(self):
-        if self.quoted_tokens is None:
-            self.quoted_tokens = []
+        # Stored immutable; from_dict may hand back a list
+        self.quoted_tokens = tuple(self.quoted_tokens or ())
         # Calculate total_debt if not set
         if self.total_debt == 0 and (self.debt > 0 or self.accrued_interest > 0 or self.accrued_fees > 0):
             self.total_debt = self.debt + self.accrued_interest + self.accrued_fees
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for serialization"""
-        return asdict(self)
+        return {
+            "credit_account": self.credit_account,
+            "account_address": self.account_address,
+            "debt": self.debt,
+            "accrued_interest": self.accrued_interest,
+            "accrued_fees": self.accrued_fees,
+            "total_debt": self.total_debt,
+            "collateral_usd": self.collateral_usd,
+            "weighted_collateral_usd": self.weighted_collateral_usd,
+            "health_factor": self.health_factor,
+            "quoted_tokens": self.quoted_tokens,
+            "timestamp_block": self.timestamp_block,
+        }
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'AccountState':
@@ -131,23 +329,24 @@ class AccountState:
     def update_from_summary(self, summary: Dict[str, Any]):
         """Update state from account summary"""
         if summary.get("success"):
-            self.debt = summary.get("debt", 0)
-            self.accrued_interest = summary.get("accrued_interest", 0)
-            self.accrued_fees = summary.get("accrued_fees", 0)
-            self.total_debt = summary.get("total_debt", 0)
-            self.collateral_usd = summary.get("collateral_usd", 0)
-            self.weighted_collateral_usd = summary.get("weighted_collateral_usd", 0)
-            self.health_factor = summary.get("health_factor")
-            self.quoted_tokens = summary.get("quoted_tokens", [])
+            # Successful summaries from StateReader always carry every key
+            self.debt = summary["debt"]
+            self.accrued_interest = summary["accrued_interest"]
+            self.accrued_fees = summary["accrued_fees"]
+            self.total_debt = summary["total_debt"]
+            self.collateral_usd = summary["collateral_usd"]
+            self.weighted_collateral_usd = summary["weighted_collateral_usd"]
+            self.health_factor = summary["health_factor"]
+            self.quoted_tokens = tuple(summary["quoted_tokens"])
 
 
 class StateManager:
     """Manages account state and provides state tracking"""
     
-    def __init__(self, w3: Web3, contract_manager: ContractManager):
+    def __init__(self, w3: Web3, contract_manager: ContractManager, fork_client=None):
         self.w3 = w3
         self.cm = contract_manager
-        self.state_reader = StateReader(w3, contract_manager)
+        self.state_reader = StateReader(w3, contract_manager, fork_client)
         self._states: Dict[str, AccountState] = {}
     
     def get_state(
@@ -167,11 +366,21 @@ class StateManager:
         Returns:
             AccountState object
         """
-        credit_account = self.w3.to_checksum_address(credit_account)
+        credit_account = checksum_address(credit_account)
         
         # Return cached state if exists and not refreshing
-        if not refresh and credit_account in self._states:
-            return self._states[credit_account]
+        cached = self._states.get(credit_account)
+        if not refresh and cached is not None:
+            return cached
+        
+        # A refresh within the block the state was read at changes nothing
+        block = self.state_reader.block_number
+        if (
+            cached is not None
+            and cached.timestamp_block == block
+            and account_address in (None, cached.account_address)
+        ):
+            return cached
         
         # Fetch fresh state
         summary = self.state_reader.get_account_summary(credit_account)
@@ -188,6 +397,8 @@ class StateManager:
             account_address=account_address,
         )
         state.update_from_summary(summary)
+        if summary.get("success"):
+            state.timestamp_block = block
         
         # Cache state
         self._states[credit_account] = state
@@ -228,7 +439,7 @@ class StateManager:
     def clear_state(self, credit_account: Optional[str] = None):
         """Clear state cache"""
         if credit_account:
-            credit_account = self.w3.to_checksum_address(credit_account)
+            credit_account = checksum_address(credit_account)
             if credit_account in self._states:
                 del self._states[credit_account]
         else:
@@ -241,18 +452,28 @@ class StateStore:
     This can be used with Streamlit session_state or similar.
     """
     
-    def __init__(self, session_state=None):
+    def __init__(self, session_state=None, packed: bool = False):
         """
         Initialize state store
         
         Args:
             session_state: Session state object (e.g., st.session_state in Streamlit)
                           If None, uses in-memory dict
+            packed: Store account states as MessagePack blobs instead of
+                    nested dicts (requires the msgpack package). Only worth it
+                    when the session is serialized, e.g. with Streamlit's
+                    runner.enforceSerializableSessionState; ignored for the
+                    in-memory dict.
         """
+        self._packer = None
         if session_state is None:
             self._store = {}
         else:
             self._store = session_state
+            if packed:
+                import msgpack
+
+                self._packer = msgpack
     
     def get(self, key: str, default: Any = None) -> Any:
         """Get value from store"""
@@ -273,10 +494,15 @@ class StateStore:
     
     def get_state(self, credit_account: str) -> Optional[Dict[str, Any]]:
         """Get account state from store"""
-        return self.get(f"state_{credit_account}")
+        state = self.get(f"state_{credit_account}")
+        if self._packer is not None and state is not None:
+            return self._packer.unpackb(state, raw=False)
+        return state
     
     def set_state(self, credit_account: str, state: Dict[str, Any]):
         """Save account state to store"""
+        if self._packer is not None:
+            state = self._packer.packb(state, use_bin_type=True)
         self.set(f"state_{credit_account}", state)
     
     def get_credit_account(self, account_address: str) -> Optional[str]:
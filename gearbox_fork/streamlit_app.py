@@ -9,26 +9,59 @@ Provides a user-friendly interface for:
 - Closing accounts
 """
 
+import json
+import time
 import streamlit as st
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, Any, Optional
 import sys
 from pathlib import Path
+from dotenv import load_dotenv
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+# Load .env before config reads the environment; later reruns reuse the
+# already-imported config module
+if "gearbox_fork.config" not in sys.modules:
+    load_dotenv()
+
 from gearbox_fork.fork_client import ForkClient
 from gearbox_fork.contracts import ContractManager
 from gearbox_fork.credit_account_controller import CreditAccountController
-from gearbox_fork.state import StateStore, StateReader
+from gearbox_fork.state import StateStore
 from gearbox_fork.wallet_manager import WalletManager
-from gearbox_fork.config import USDC, CREDIT_MANAGER_V3
+from gearbox_fork.config import USDC, CREDIT_MANAGER_V3, TX_LOG_DIR
 from gearbox_fork.anvil_accounts import get_address
 from gearbox_fork.transactions import prepare_repay_all_debt
 
 # Constants
 MAX_UINT256 = 2**256 - 1
+GAS_FUND_AMOUNT = 10 * 10**18  # ETH set on the wallet by "Fund ETH"
+
+# Transaction log: last entries kept in session, and on disk only when
+# GEARBOX_TX_LOG_DIR is set
+TX_LOG_SIZE = 20
+TX_LOG_PATH = Path(TX_LOG_DIR) / "tx_log.jsonl" if TX_LOG_DIR else None
+
+
+def load_transaction_log() -> deque:
+    """Rehydrate the most recent log entries (newest first) from disk"""
+    log = deque(maxlen=TX_LOG_SIZE)
+    if TX_LOG_PATH is None:
+        return log
+    try:
+        with open(TX_LOG_PATH, "r") as f:
+            for line in deque(f, maxlen=TX_LOG_SIZE):
+                try:
+                    log.appendleft(json.loads(line))
+                except ValueError:
+                    pass  # Skip a partially written line
+    except OSError:
+        pass
+    return log
 
 # Page config
 st.set_page_config(
@@ -37,8 +70,7 @@ st.set_page_config(
     layout="wide",
 )
 
-st.markdown(
-    """
+PAGE_CSS = """
 <style>
     .rightPanel {
         position: fixed;
@@ -56,9 +88,16 @@ st.markdown(
         padding-right: 320px;
     }
 </style>
-""",
-    unsafe_allow_html=True,
-)
+"""
+
+
+@st.cache_resource
+def _inject_css():
+    """Emit the page CSS; later reruns replay the cached element"""
+    st.markdown(PAGE_CSS, unsafe_allow_html=True)
+
+
+_inject_css()
 
 # Initialize session state
 if "controller" not in st.session_state:
@@ -71,10 +110,13 @@ if "controller" not in st.session_state:
             w3, cm, fork_client, state_store
         )
         st.session_state.wallet_manager = WalletManager(fork_client)
-        st.session_state.state_reader = StateReader(w3, cm)
+        # Share the controller's reader so both see the same per-block cache
+        st.session_state.state_reader = (
+            st.session_state.controller.state_manager.state_reader
+        )
         st.session_state.account_index = 0
         st.session_state.credit_account = None
-        st.session_state.transaction_log = []
+        st.session_state.transaction_log = load_transaction_log()
         if "expander_add_collateral_open" not in st.session_state:
             st.session_state.expander_add_collateral_open = False
     except Exception as e:
@@ -88,13 +130,24 @@ state_reader = st.session_state.state_reader
 fork_client = controller.fork_client
 
 
+@st.cache_resource
+def _mine_pool() -> ThreadPoolExecutor:
+    """Single worker shared across reruns for post-action block mining"""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="mine")
+
+
+def mine_block_in_background():
+    """Mine one block without making the rerun wait for it"""
+    st.session_state.pending_mine = _mine_pool().submit(controller.mine_blocks, 1)
+
+
 def log_transaction(action_name: str, result: Dict[str, Any], success: bool = None):
     """Log transaction to session state"""
     if success is None:
         success = result.get("success", False)
 
     log_entry = {
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "timestamp": time.time_ns(),  # Formatted only when the log is shown
         "action": action_name,
         "success": success,
         "tx_hash": result.get("tx_hash"),
@@ -102,12 +155,43 @@ def log_transaction(action_name: str, result: Dict[str, Any], success: bool = No
     }
 
     if "transaction_log" not in st.session_state:
-        st.session_state.transaction_log = []
+        st.session_state.transaction_log = load_transaction_log()
+
+    # Newest first; the deque drops the oldest entry past TX_LOG_SIZE
+    st.session_state.transaction_log.appendleft(log_entry)
 
-    st.session_state.transaction_log.insert(0, log_entry)  # Add to beginning
-    # Keep only last 20 entries
-    if len(st.session_state.transaction_log) > 20:
-        st.session_state.transaction_log = st.session_state.transaction_log[:20]
+    # Account views are shared across sessions, and a write that mines no
+    # block (e.g. anvil_setBalance) leaves the block key unchanged
+    if success:
+        _cached_account_view.clear()
+
+    if TX_LOG_PATH is not None:
+        append_to_log_file(log_entry)
+
+
+def append_to_log_file(log_entry: Dict[str, Any]):
+    """Append an entry, trimming the file to the last TX_LOG_SIZE entries"""
+    try:
+        TX_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(TX_LOG_PATH, "a") as f:
+            f.write(json.dumps(log_entry, default=str) + "\n")
+        with open(TX_LOG_PATH, "r") as f:
+            lines = f.readlines()
+        # Rewrite only once the file has doubled, not on every append
+        if len(lines) > 2 * TX_LOG_SIZE:
+            tmp_path = TX_LOG_PATH.with_suffix(".tmp")
+            with open(tmp_path, "w") as f:
+                f.writelines(lines[-TX_LOG_SIZE:])
+            tmp_path.replace(TX_LOG_PATH)
+    except OSError:
+        pass  # Persistence is best effort
+
+
+def _fmt_ts(ts) -> str:
+    """Format a log timestamp (ns since epoch; older entries stored text)"""
+    if isinstance(ts, int):
+        return datetime.fromtimestamp(ts / 1e9).strftime("%Y-%m-%d %H:%M:%S")
+    return ts or "N/A"
 
 
 def set_flash_success(msg: str, tx_hash: Optional[str] = None) -> None:
@@ -120,18 +204,56 @@ def set_flash_error(msg: str) -> None:
     st.session_state.flash_error = {"msg": msg}
 
 
+# Forget the previous run's mining job once it has finished, surfacing a
+# failure (an exception, or a JSON-RPC error the node returned)
+_pending_mine = st.session_state.get("pending_mine")
+if _pending_mine is not None and _pending_mine.done():
+    del st.session_state.pending_mine
+    _mine_error = _pending_mine.exception()
+    if _mine_error is None:
+        _mine_error = (_pending_mine.result() or {}).get("error")
+    if _mine_error is not None:
+        set_flash_error(f"❌ Background block mining failed: {_mine_error}")
+
+
+@st.cache_data(ttl=30, max_entries=128, show_spinner=False)
+def _cached_account_view(
+    _reader, credit_account: str, block: int, state_version: int
+):
+    """Summary + balances for a credit account at a block.
+
+    Keyed on the block and the fork client's state version, so any tx,
+    mined block or balance write makes the next rerun miss. Failed
+    summaries raise instead of returning, so they are never cached.
+    """
+    summary, balances = _reader.get_account_view(credit_account)
+    if not summary.get("success"):
+        raise RuntimeError(summary.get("error"))
+    return summary, balances
+
+
+def get_account_view(credit_account: str):
+    """Cached summary + balances for the fork's current block"""
+    return _cached_account_view(
+        state_reader,
+        credit_account,
+        fork_client.block_number,
+        fork_client.state_version,
+    )
+
+
 def display_account_summary(credit_account: str):
     """Display formatted account summary"""
     if not credit_account:
         return
 
     try:
-        state = controller.get_state(credit_account, refresh=True)
-        summary = state_reader.get_account_summary(credit_account)
-        balances = state_reader.get_credit_account_balances(credit_account)
-
-        if not summary.get("success"):
-            st.error(f"Error getting summary: {summary.get('error')}")
+        try:
+            # One JSON-RPC batch for summary + balances, reused across reruns
+            # until the fork changes
+            summary, balances = get_account_view(credit_account)
+        except RuntimeError as e:
+            st.error(f"Error getting summary: {e}")
             return
 
         # Account info card
@@ -196,23 +318,9 @@ def get_account_address(account_index: int) -> str:
         return f"Account {account_index}"
 
 
-# Sidebar
-with st.sidebar:
-    st.header("⚙️ Settings")
-
-    # Account selection
-    account_index = st.selectbox(
-        "Account Index",
-        options=list(range(10)),
-        index=st.session_state.account_index,
-        help="Select Anvil account (0-9)",
-    )
-    st.session_state.account_index = account_index
-    account_address = get_account_address(account_index)
-    st.caption(f"Address: `{account_address}`")
-
-    st.divider()
-
+@st.fragment
+def wallet_sidebar_fragment():
+    """Funding buttons and wallet balances (reruns on its own)"""
     # Funding section
     st.subheader("💰 Fund Account")
 
@@ -220,9 +328,8 @@ with st.sidebar:
     if st.button("Fund ETH (for gas)", use_container_width=True, key="fund_eth_btn"):
         try:
             with st.spinner("Funding ETH..."):
-                fork_client.set_balance(account_address, 10 * 10**18)
-                eth_balance = controller.w3.eth.get_balance(account_address)
-                st.success(f"Funded! Balance: {eth_balance / 10**18:.2f} ETH")
+                fork_client.set_balance(account_address, GAS_FUND_AMOUNT)
+                st.success(f"Funded! Balance: {GAS_FUND_AMOUNT / 10**18:.2f} ETH")
                 log_transaction(
                     "Fund ETH",
                     {"success": True, "tx_hash": "N/A (balance set)"},
@@ -275,8 +382,10 @@ with st.sidebar:
     except:
         pass
 
-    st.divider()
 
+@st.fragment
+def advance_blocks_fragment():
+    """Block mining controls (reruns on its own)"""
     # Advance blocks section
     st.subheader("⏰ Advance Blocks")
     if st.session_state.credit_account:
@@ -308,7 +417,7 @@ with st.sidebar:
                         "accrued_fees", 0
                     ) + summary_before.get("accrued_interest", 0)
 
-                    fork_client.mine_blocks(advance_blocks)
+                    controller.mine_blocks(advance_blocks)
 
                     summary_after = state_reader.get_account_summary(
                         st.session_state.credit_account
@@ -339,6 +448,30 @@ with st.sidebar:
     else:
         st.info("Open a credit account to advance blocks and track fees")
 
+
+# Sidebar
+with st.sidebar:
+    st.header("⚙️ Settings")
+
+    # Account selection
+    account_index = st.selectbox(
+        "Account Index",
+        options=list(range(10)),
+        index=st.session_state.account_index,
+        help="Select Anvil account (0-9)",
+    )
+    st.session_state.account_index = account_index
+    account_address = get_account_address(account_index)
+    st.caption(f"Address: `{account_address}`")
+
+    st.divider()
+
+    wallet_sidebar_fragment()
+
+    st.divider()
+
+    advance_blocks_fragment()
+
 # Main area
 st.title("⚙️ Gearbox Protocol - Credit Account Manager")
 
@@ -364,289 +497,155 @@ if st.session_state.get("flash_error"):
     st.error(data["msg"])
     del st.session_state.flash_error
 
-# Open Account
-with st.expander(
-    "📝 Open Credit Account", expanded=not st.session_state.credit_account
-):
-    if st.session_state.credit_account:
-        st.warning("⚠️ Credit account already exists. Close it first to open a new one.")
-    else:
-        if st.button(
-            "Open Account",
-            type="primary",
-            use_container_width=True,
-            key="open_account_btn",
-        ):
-            try:
-                with st.spinner("Opening credit account..."):
-                    # Fund ETH if needed
-                    eth_balance = controller.w3.eth.get_balance(account_address)
-                    if eth_balance < 10 * 10**18:
-                        fork_client.set_balance(account_address, 10 * 10**18)
-
-                    # Open account with empty multicall
-                    result = controller.execute_open_account(
-                        account_index=account_index,
-                        calls=[],
-                    )
-
-                    if result.get("success"):
-                        st.session_state.credit_account = result["credit_account"]
-                        log_transaction("Open Account", result, success=True)
-                        fork_client.mine_blocks(
-                            1
-                        )  # Advance one block after successful action
-                        set_flash_success(
-                            f"✅ Account opened! Credit Account: `{result['credit_account']}`",
-                            tx_hash=result.get("tx_hash"),
-                        )
-                        st.rerun()
-                    else:
-                        log_transaction("Open Account", result, success=False)
-                        set_flash_error(
-                            f"❌ Failed: {result.get('error', 'Unknown error')}"
-                        )
-                        st.rerun()
-            except Exception as e:
-                log_transaction(
-                    "Open Account", {"success": False, "error": str(e)}, success=False
-                )
-                set_flash_error(f"❌ Error: {str(e)}")
-                st.rerun()
-
-with st.expander(
-    "💎 Add Collateral",
-    expanded=st.session_state.get("expander_add_collateral_open", False),
-):
-    if not st.session_state.credit_account:
-        st.warning("⚠️ Please open a credit account first.")
-    else:
-        # Get account address for this section
-        account_address = get_account_address(st.session_state.account_index)
-
-        collateral_amount = st.number_input(
-            "Amount (USDC)",
-            min_value=0.0,
-            value=1000.0,
-            step=100.0,
-            key="collateral_amount",
-        )
-
-        token_address = USDC
-        token_decimals = 6
-        amount_wei = int(collateral_amount * (10**token_decimals))
-
-        if st.button(
-            "Add Collateral",
-            use_container_width=True,
-            type="primary",
-            key="add_collateral_btn",
-        ):
-            try:
-                with st.spinner(f"Adding {collateral_amount} USDC as collateral..."):
-                    # Step 1: Fund from whale if needed
-                    token_contract = controller.cm.get_erc20(token_address)
-                    balance = token_contract.functions.balanceOf(account_address).call()
-                    if balance < amount_wei:
-                        st.info(f"💰 Funding {collateral_amount} USDC...")
-                        fund_result = wallet_manager.fund_from_whale(
-                            account_address, token_address, amount_wei
-                        )
-                        if not fund_result.get("success"):
-                            log_transaction(
-                                "Add Collateral", fund_result, success=False
-                            )
-                            set_flash_error(
-                                f"❌ Failed to fund: {fund_result.get('error', 'Unknown error')}"
-                            )
-                            st.session_state.expander_add_collateral_open = True
-                            st.rerun()
-                        st.success(
-                            f"✅ Funded {fund_result['balance'] / (10**token_decimals):.2f} USDC"
-                        )
-
-                    # Step 2: Automatically approve Credit Manager if needed
-                    allowance = token_contract.functions.allowance(
-                        account_address, CREDIT_MANAGER_V3
-                    ).call()
-                    if allowance < amount_wei:
-                        st.info(
-                            f"🔐 Approving Credit Manager to spend {collateral_amount} USDC..."
-                        )
-                        approve_result = wallet_manager.approve_token(
-                            account_index, token_address, CREDIT_MANAGER_V3, amount_wei
-                        )
-                        if not approve_result.get("success"):
-                            log_transaction(
-                                "Add Collateral", approve_result, success=False
-                            )
-                            set_flash_error(
-                                f"❌ Failed to approve: {approve_result.get('error', 'Unknown error')}"
-                            )
-                            st.session_state.expander_add_collateral_open = True
-                            st.rerun()
-                        st.success("✅ Approval successful")
-
-                    # Prepare calls
-                    calls = []
-                    call = controller.prepare_action(
-                        "add_collateral", token=token_address, amount=amount_wei
-                    )
-                    calls.append(call)
-
-                    # Execute (simulation happens automatically in execute_multicall)
-                    result = controller.execute_multicall(
-                        st.session_state.credit_account,
-                        calls,
-                        account_index=account_index,
-                    )
-
-                    if result.get("success"):
-                        log_transaction("Add Collateral", result, success=True)
-                        fork_client.mine_blocks(
-                            1
-                        )  # Advance one block after successful action
-                        set_flash_success(
-                            f"🎉 **Success!** Added {collateral_amount} USDC as collateral!",
-                            tx_hash=result.get("tx_hash"),
-                        )
-                        st.session_state.expander_add_collateral_open = True
-                        st.rerun()
-                    else:
-                        err = result.get("simulation_error") or result.get(
-                            "error", "Unknown error"
-                        )
-                        log_transaction("Add Collateral", result, success=False)
-                        set_flash_error(f"❌ {err}")
-                        st.session_state.expander_add_collateral_open = True
-                        st.rerun()
-            except Exception as e:
-                log_transaction(
-                    "Add Collateral",
-                    {"success": False, "error": str(e)},
-                    success=False,
-                )
-                set_flash_error(f"❌ Error: {str(e)}")
-                st.session_state.expander_add_collateral_open = True
-                st.rerun()
 
-with st.expander("📈 Increase Debt (Borrow)"):
-    if not st.session_state.credit_account:
-        st.warning("⚠️ Please open a credit account first.")
-    else:
-        # Get account address for this section
-        account_address = get_account_address(st.session_state.account_index)
-
-        borrow_amount = st.number_input(
-            "Borrow Amount (USDC)",
-            min_value=0.0,
-            value=1000.0,
-            step=100.0,
-            key="borrow_amount",
-        )
-        amount_wei = int(borrow_amount * 10**6)
-
-        if st.button("Borrow", use_container_width=True, key="borrow_btn"):
-            try:
-                with st.spinner(f"Borrowing {borrow_amount} USDC..."):
-                    call = controller.prepare_action("increase_debt", amount=amount_wei)
-                    result = controller.execute_multicall(
-                        st.session_state.credit_account,
-                        [call],
-                        account_index=account_index,
-                    )
-
-                    if result.get("success"):
-                        log_transaction("Increase Debt", result, success=True)
-                        fork_client.mine_blocks(
-                            1
-                        )  # Advance one block after successful action
-                        set_flash_success(
-                            f"🎉 **Success!** Borrowed {borrow_amount} USDC!",
-                            tx_hash=result.get("tx_hash"),
-                        )
-                        st.rerun()
-                    else:
-                        log_transaction("Increase Debt", result, success=False)
-                        set_flash_error(
-                            f"❌ Failed: {result.get('error', 'Unknown error')}"
-                        )
-                        st.rerun()
-            except Exception as e:
-                log_transaction(
-                    "Increase Debt", {"success": False, "error": str(e)}, success=False
-                )
-                set_flash_error(f"❌ Error: {str(e)}")
-                st.rerun()
-
-with st.expander("💳 Repay Debt"):
-    if not st.session_state.credit_account:
-        st.warning("⚠️ Please open a credit account first.")
-    else:
-        # Get account address for this section
-        account_address = get_account_address(st.session_state.account_index)
-
-        repay_amount = st.number_input(
-            "Repay Amount (USDC)",
-            min_value=0.0,
-            value=1000.0,
-            step=100.0,
-            key="repay_amount",
-        )
-        amount_wei = int(repay_amount * 10**6)
-
-        col1, col2 = st.columns(2)
-        with col1:
+# Open Account
+@st.fragment
+def open_account_fragment():
+    """Open Account expander"""
+    with st.expander(
+        "📝 Open Credit Account", expanded=not st.session_state.credit_account
+    ):
+        if st.session_state.credit_account:
+            st.warning("⚠️ Credit account already exists. Close it first to open a new one.")
+        else:
             if st.button(
-                "Repay Debt",
-                use_container_width=True,
+                "Open Account",
                 type="primary",
-                key="repay_debt_btn",
+                use_container_width=True,
+                key="open_account_btn",
             ):
                 try:
-                    with st.spinner(f"Repaying {repay_amount} USDC..."):
-                        call = controller.prepare_action(
-                            "decrease_debt", amount=amount_wei
-                        )
-                        result = controller.execute_multicall(
-                            st.session_state.credit_account,
-                            [call],
+                    with st.spinner("Opening credit account..."):
+                        # Fund ETH if needed
+                        if fork_client.get_balance(account_address) < GAS_FUND_AMOUNT:
+                            fork_client.set_balance(account_address, GAS_FUND_AMOUNT)
+
+                        # Open account with empty multicall
+                        result = controller.execute_open_account(
                             account_index=account_index,
+                            calls=[],
                         )
 
                         if result.get("success"):
-                            log_transaction("Repay Debt", result, success=True)
-                            fork_client.mine_blocks(
-                                1
-                            )  # Advance one block after successful action
+                            st.session_state.credit_account = result["credit_account"]
+                            log_transaction("Open Account", result, success=True)
+                            mine_block_in_background()  # Advance one block after successful action
                             set_flash_success(
-                                f"🎉 **Success!** Repaid {repay_amount} USDC!",
+                                f"✅ Account opened! Credit Account: `{result['credit_account']}`",
                                 tx_hash=result.get("tx_hash"),
                             )
                             st.rerun()
                         else:
-                            log_transaction("Repay Debt", result, success=False)
+                            log_transaction("Open Account", result, success=False)
                             set_flash_error(
                                 f"❌ Failed: {result.get('error', 'Unknown error')}"
                             )
                             st.rerun()
                 except Exception as e:
                     log_transaction(
-                        "Repay Debt", {"success": False, "error": str(e)}, success=False
+                        "Open Account", {"success": False, "error": str(e)}, success=False
                     )
                     set_flash_error(f"❌ Error: {str(e)}")
                     st.rerun()
-        with col2:
+
+
+open_account_fragment()
+
+
+@st.fragment
+def add_collateral_fragment():
+    """Add Collateral expander"""
+    with st.expander(
+        "💎 Add Collateral",
+        expanded=st.session_state.get("expander_add_collateral_open", False),
+    ):
+        if not st.session_state.credit_account:
+            st.warning("⚠️ Please open a credit account first.")
+        else:
+            collateral_amount = st.number_input(
+                "Amount (USDC)",
+                min_value=0.0,
+                value=1000.0,
+                step=100.0,
+                key="collateral_amount",
+            )
+
+            token_address = USDC
+            token_decimals = 6
+            amount_wei = int(collateral_amount * (10**token_decimals))
+
             if st.button(
-                "Repay All Debt", use_container_width=True, key="repay_all_debt_btn"
+                "Add Collateral",
+                use_container_width=True,
+                type="primary",
+                key="add_collateral_btn",
             ):
                 try:
-                    with st.spinner("Repaying all debt..."):
-                        # Use prepare_repay_all_debt to repay all debt
-                        credit_manager = controller.cm.get_credit_manager(
-                            CREDIT_MANAGER_V3
+                    with st.spinner(f"Adding {collateral_amount} USDC as collateral..."):
+                        # Once a MAX approval is in place only the balance is
+                        # needed, and the sidebar has usually cached it already
+                        if wallet_manager.is_approved(
+                            account_address, token_address, CREDIT_MANAGER_V3
+                        ):
+                            balance = state_reader.get_account_balances(
+                                account_address
+                            )["USDC"]
+                            allowance = MAX_UINT256
+                        else:
+                            # Pre-flight reads (balance + allowance) in one eth_call
+                            balance, allowance = (
+                                wallet_manager.get_balance_and_allowance(
+                                    account_address, token_address, CREDIT_MANAGER_V3
+                                )
+                            )
+
+                        # Step 1: Fund from whale if needed
+                        if balance < amount_wei:
+                            st.info(f"💰 Funding {collateral_amount} USDC...")
+                            fund_result = wallet_manager.fund_from_whale(
+                                account_address, token_address, amount_wei
+                            )
+                            if not fund_result.get("success"):
+                                log_transaction(
+                                    "Add Collateral", fund_result, success=False
+                                )
+                                set_flash_error(
+                                    f"❌ Failed to fund: {fund_result.get('error', 'Unknown error')}"
+                                )
+                                st.session_state.expander_add_collateral_open = True
+                                st.rerun()
+                            st.success(
+                                f"✅ Funded {fund_result['balance'] / (10**token_decimals):.2f} USDC"
+                            )
+
+                        # Step 2: Automatically approve Credit Manager if needed
+                        # (funding doesn't change the allowance read above)
+                        if allowance < amount_wei:
+                            st.info(
+                                f"🔐 Approving Credit Manager to spend {collateral_amount} USDC..."
+                            )
+                            approve_result = wallet_manager.approve_token(
+                                account_index, token_address, CREDIT_MANAGER_V3, MAX_UINT256
+                            )
+                            if not approve_result.get("success"):
+                                log_transaction(
+                                    "Add Collateral", approve_result, success=False
+                                )
+                                set_flash_error(
+                                    f"❌ Failed to approve: {approve_result.get('error', 'Unknown error')}"
+                                )
+                                st.session_state.expander_add_collateral_open = True
+                                st.rerun()
+                            st.success("✅ Approval successful")
+
+                        # Prepare calls
+                        calls = []
+                        call = controller.prepare_action(
+                            "add_collateral", token=token_address, amount=amount_wei
                         )
-                        calls = prepare_repay_all_debt(controller.cm)
+                        calls.append(call)
+
+                        # Execute (simulation happens automatically in execute_multicall)
                         result = controller.execute_multicall(
                             st.session_state.credit_account,
                             calls,
@@ -654,66 +653,56 @@ with st.expander("💳 Repay Debt"):
                         )
 
                         if result.get("success"):
-                            log_transaction("Repay All Debt", result, success=True)
-                            fork_client.mine_blocks(
-                                1
-                            )  # Advance one block after successful action
+                            log_transaction("Add Collateral", result, success=True)
+                            mine_block_in_background()  # Advance one block after successful action
                             set_flash_success(
-                                "🎉 **Success!** All debt repaid!",
+                                f"🎉 **Success!** Added {collateral_amount} USDC as collateral!",
                                 tx_hash=result.get("tx_hash"),
                             )
+                            st.session_state.expander_add_collateral_open = True
                             st.rerun()
                         else:
-                            log_transaction("Repay All Debt", result, success=False)
-                            set_flash_error(
-                                f"❌ Failed: {result.get('error', 'Unknown error')}"
+                            err = result.get("simulation_error") or result.get(
+                                "error", "Unknown error"
                             )
+                            log_transaction("Add Collateral", result, success=False)
+                            set_flash_error(f"❌ {err}")
+                            st.session_state.expander_add_collateral_open = True
                             st.rerun()
                 except Exception as e:
                     log_transaction(
-                        "Repay All Debt",
+                        "Add Collateral",
                         {"success": False, "error": str(e)},
                         success=False,
                     )
                     set_flash_error(f"❌ Error: {str(e)}")
+                    st.session_state.expander_add_collateral_open = True
                     st.rerun()
 
-with st.expander("💸 Withdraw Collateral"):
-    if not st.session_state.credit_account:
-        st.warning("⚠️ Please open a credit account first.")
-    else:
-        # Get account address for this section
-        account_address = get_account_address(st.session_state.account_index)
-
-        withdraw_amount = st.number_input(
-            "Amount (USDC)",
-            min_value=0.0,
-            value=1000.0,
-            step=100.0,
-            key="withdraw_amount",
-        )
 
-        token_address = USDC
-        token_decimals = 6
-        amount_wei = int(withdraw_amount * (10**token_decimals))
+add_collateral_fragment()
 
-        col_exec1, col_exec2 = st.columns(2)
 
-        with col_exec1:
-            if st.button(
-                "Withdraw Collateral",
-                key="withdraw_exec",
-                use_container_width=True,
-                type="primary",
-            ):
+@st.fragment
+def increase_debt_fragment():
+    """Increase Debt expander"""
+    with st.expander("📈 Increase Debt (Borrow)"):
+        if not st.session_state.credit_account:
+            st.warning("⚠️ Please open a credit account first.")
+        else:
+            borrow_amount = st.number_input(
+                "Borrow Amount (USDC)",
+                min_value=0.0,
+                value=1000.0,
+                step=100.0,
+                key="borrow_amount",
+            )
+            amount_wei = int(borrow_amount * 10**6)
+
+            if st.button("Borrow", use_container_width=True, key="borrow_btn"):
                 try:
-                    with st.spinner(f"Withdrawing {withdraw_amount} USDC..."):
-                        call = controller.prepare_action(
-                            "withdraw_collateral",
-                            token=token_address,
-                            amount=amount_wei,
-                            to=account_address,
-                        )
+                    with st.spinner(f"Borrowing {borrow_amount} USDC..."):
+                        call = controller.prepare_action("increase_debt", amount=amount_wei)
                         result = controller.execute_multicall(
                             st.session_state.credit_account,
                             [call],
@@ -721,141 +710,310 @@ with st.expander("💸 Withdraw Collateral"):
                         )
 
                         if result.get("success"):
-                            log_transaction("Withdraw Collateral", result, success=True)
-                            fork_client.mine_blocks(
-                                1
-                            )  # Advance one block after successful action
+                            log_transaction("Increase Debt", result, success=True)
+                            mine_block_in_background()  # Advance one block after successful action
                             set_flash_success(
-                                f"🎉 **Success!** Withdrew {withdraw_amount} USDC!",
+                                f"🎉 **Success!** Borrowed {borrow_amount} USDC!",
                                 tx_hash=result.get("tx_hash"),
                             )
                             st.rerun()
                         else:
-                            err = result.get("simulation_error") or result.get(
-                                "error", "Unknown error"
-                            )
-                            log_transaction(
-                                "Withdraw Collateral", result, success=False
+                            log_transaction("Increase Debt", result, success=False)
+                            set_flash_error(
+                                f"❌ Failed: {result.get('error', 'Unknown error')}"
                             )
-                            set_flash_error(f"❌ {err}")
                             st.rerun()
                 except Exception as e:
                     log_transaction(
-                        "Withdraw Collateral",
-                        {"success": False, "error": str(e)},
-                        success=False,
+                        "Increase Debt", {"success": False, "error": str(e)}, success=False
                     )
                     set_flash_error(f"❌ Error: {str(e)}")
                     st.rerun()
 
-        with col_exec2:
+
+increase_debt_fragment()
+
+
+@st.fragment
+def repay_debt_fragment():
+    """Repay Debt expander"""
+    with st.expander("💳 Repay Debt"):
+        if not st.session_state.credit_account:
+            st.warning("⚠️ Please open a credit account first.")
+        else:
+            repay_amount = st.number_input(
+                "Repay Amount (USDC)",
+                min_value=0.0,
+                value=1000.0,
+                step=100.0,
+                key="repay_amount",
+            )
+            amount_wei = int(repay_amount * 10**6)
+
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button(
+                    "Repay Debt",
+                    use_container_width=True,
+                    type="primary",
+                    key="repay_debt_btn",
+                ):
+                    try:
+                        with st.spinner(f"Repaying {repay_amount} USDC..."):
+                            call = controller.prepare_action(
+                                "decrease_debt", amount=amount_wei
+                            )
+                            result = controller.execute_multicall(
+                                st.session_state.credit_account,
+                                [call],
+                                account_index=account_index,
+                            )
+
+                            if result.get("success"):
+                                log_transaction("Repay Debt", result, success=True)
+                                mine_block_in_background()  # Advance one block after successful action
+                                set_flash_success(
+                                    f"🎉 **Success!** Repaid {repay_amount} USDC!",
+                                    tx_hash=result.get("tx_hash"),
+                                )
+                                st.rerun()
+                            else:
+                                log_transaction("Repay Debt", result, success=False)
+                                set_flash_error(
+                                    f"❌ Failed: {result.get('error', 'Unknown error')}"
+                                )
+                                st.rerun()
+                    except Exception as e:
+                        log_transaction(
+                            "Repay Debt", {"success": False, "error": str(e)}, success=False
+                        )
+                        set_flash_error(f"❌ Error: {str(e)}")
+                        st.rerun()
+            with col2:
+                if st.button(
+                    "Repay All Debt", use_container_width=True, key="repay_all_debt_btn"
+                ):
+                    try:
+                        with st.spinner("Repaying all debt..."):
+                            # Use prepare_repay_all_debt to repay all debt
+                            calls = prepare_repay_all_debt(controller.cm)
+                            result = controller.execute_multicall(
+                                st.session_state.credit_account,
+                                calls,
+                                account_index=account_index,
+                            )
+
+                            if result.get("success"):
+                                log_transaction("Repay All Debt", result, success=True)
+                                mine_block_in_background()  # Advance one block after successful action
+                                set_flash_success(
+                                    "🎉 **Success!** All debt repaid!",
+                                    tx_hash=result.get("tx_hash"),
+                                )
+                                st.rerun()
+                            else:
+                                log_transaction("Repay All Debt", result, success=False)
+                                set_flash_error(
+                                    f"❌ Failed: {result.get('error', 'Unknown error')}"
+                                )
+                                st.rerun()
+                    except Exception as e:
+                        log_transaction(
+                            "Repay All Debt",
+                            {"success": False, "error": str(e)},
+                            success=False,
+                        )
+                        set_flash_error(f"❌ Error: {str(e)}")
+                        st.rerun()
+
+
+repay_debt_fragment()
+
+
+@st.fragment
+def withdraw_collateral_fragment():
+    """Withdraw Collateral expander"""
+    with st.expander("💸 Withdraw Collateral"):
+        if not st.session_state.credit_account:
+            st.warning("⚠️ Please open a credit account first.")
+        else:
+            withdraw_amount = st.number_input(
+                "Amount (USDC)",
+                min_value=0.0,
+                value=1000.0,
+                step=100.0,
+                key="withdraw_amount",
+            )
+
+            token_address = USDC
+            token_decimals = 6
+            amount_wei = int(withdraw_amount * (10**token_decimals))
+
+            col_exec1, col_exec2 = st.columns(2)
+
+            with col_exec1:
+                if st.button(
+                    "Withdraw Collateral",
+                    key="withdraw_exec",
+                    use_container_width=True,
+                    type="primary",
+                ):
+                    try:
+                        with st.spinner(f"Withdrawing {withdraw_amount} USDC..."):
+                            call = controller.prepare_action(
+                                "withdraw_collateral",
+                                token=token_address,
+                                amount=amount_wei,
+                                to=account_address,
+                            )
+                            result = controller.execute_multicall(
+                                st.session_state.credit_account,
+                                [call],
+                                account_index=account_index,
+                            )
+
+                            if result.get("success"):
+                                log_transaction("Withdraw Collateral", result, success=True)
+                                mine_block_in_background()  # Advance one block after successful action
+                                set_flash_success(
+                                    f"🎉 **Success!** Withdrew {withdraw_amount} USDC!",
+                                    tx_hash=result.get("tx_hash"),
+                                )
+                                st.rerun()
+                            else:
+                                err = result.get("simulation_error") or result.get(
+                                    "error", "Unknown error"
+                                )
+                                log_transaction(
+                                    "Withdraw Collateral", result, success=False
+                                )
+                                set_flash_error(f"❌ {err}")
+                                st.rerun()
+                    except Exception as e:
+                        log_transaction(
+                            "Withdraw Collateral",
+                            {"success": False, "error": str(e)},
+                            success=False,
+                        )
+                        set_flash_error(f"❌ Error: {str(e)}")
+                        st.rerun()
+
+            with col_exec2:
+                if st.button(
+                    "Withdraw All Collateral",
+                    key="withdraw_all_exec",
+                    use_container_width=True,
+                ):
+                    try:
+                        with st.spinner(f"Withdrawing all USDC..."):
+                            call = controller.prepare_action(
+                                "withdraw_collateral",
+                                token=token_address,
+                                amount=MAX_UINT256,
+                                to=account_address,
+                            )
+                            result = controller.execute_multicall(
+                                st.session_state.credit_account,
+                                [call],
+                                account_index=account_index,
+                            )
+
+                            if result.get("success"):
+                                log_transaction(
+                                    "Withdraw All Collateral", result, success=True
+                                )
+                                mine_block_in_background()  # Advance one block after successful action
+                                set_flash_success(
+                                    f"🎉 **Success!** Withdrew all USDC!",
+                                    tx_hash=result.get("tx_hash"),
+                                )
+                                st.rerun()
+                            else:
+                                err = result.get("simulation_error") or result.get(
+                                    "error", "Unknown error"
+                                )
+                                log_transaction(
+                                    "Withdraw All Collateral", result, success=False
+                                )
+                                set_flash_error(f"❌ {err}")
+                                st.rerun()
+                    except Exception as e:
+                        log_transaction(
+                            "Withdraw All Collateral",
+                            {"success": False, "error": str(e)},
+                            success=False,
+                        )
+                        set_flash_error(f"❌ Error: {str(e)}")
+                        st.rerun()
+
+
+withdraw_collateral_fragment()
+
+
+# Close Account
+@st.fragment
+def close_account_fragment():
+    """Close Account expander"""
+    with st.expander("🔒 Close Credit Account"):
+        if not st.session_state.credit_account:
+            st.warning("⚠️ No credit account to close.")
+        else:
+            # Check debt (same block-keyed cache entry as the summary panel)
+            try:
+                summary, _ = get_account_view(st.session_state.credit_account)
+                debt = summary.get("debt", 0)
+                if debt > 0:
+                    st.warning(
+                        f"⚠️ Account has debt: {debt / 10**6:.2f} USDC. Repay debt before closing."
+                    )
+            except Exception as e:
+                st.caption(f"Could not check debt: {e}")
+
             if st.button(
-                "Withdraw All Collateral",
-                key="withdraw_all_exec",
+                "Close Account",
+                type="secondary",
                 use_container_width=True,
+                key="close_account_btn",
             ):
                 try:
-                    with st.spinner(f"Withdrawing all USDC..."):
-                        call = controller.prepare_action(
-                            "withdraw_collateral",
-                            token=token_address,
-                            amount=MAX_UINT256,
-                            to=account_address,
-                        )
-                        result = controller.execute_multicall(
-                            st.session_state.credit_account,
-                            [call],
+                    with st.spinner("Closing credit account..."):
+                        result = controller.close_credit_account(
+                            credit_account=st.session_state.credit_account,
                             account_index=account_index,
                         )
 
                         if result.get("success"):
-                            log_transaction(
-                                "Withdraw All Collateral", result, success=True
-                            )
-                            fork_client.mine_blocks(
-                                1
-                            )  # Advance one block after successful action
+                            st.session_state.credit_account = None
+                            log_transaction("Close Account", result, success=True)
+                            mine_block_in_background()  # Advance one block after successful action
                             set_flash_success(
-                                f"🎉 **Success!** Withdrew all USDC!",
+                                "🎉 **Success!** Credit account closed!",
                                 tx_hash=result.get("tx_hash"),
                             )
                             st.rerun()
                         else:
-                            err = result.get("simulation_error") or result.get(
-                                "error", "Unknown error"
-                            )
-                            log_transaction(
-                                "Withdraw All Collateral", result, success=False
+                            log_transaction("Close Account", result, success=False)
+                            set_flash_error(
+                                f"❌ Failed: {result.get('error', 'Unknown error')}"
                             )
-                            set_flash_error(f"❌ {err}")
                             st.rerun()
                 except Exception as e:
                     log_transaction(
-                        "Withdraw All Collateral",
-                        {"success": False, "error": str(e)},
-                        success=False,
+                        "Close Account", {"success": False, "error": str(e)}, success=False
                     )
                     set_flash_error(f"❌ Error: {str(e)}")
                     st.rerun()
 
-# Close Account
-with st.expander("🔒 Close Credit Account"):
-    if not st.session_state.credit_account:
-        st.warning("⚠️ No credit account to close.")
-    else:
-        # Check debt
-        try:
-            state = controller.get_state(st.session_state.credit_account, refresh=True)
-            if state.debt > 0:
-                st.warning(
-                    f"⚠️ Account has debt: {state.debt / 10**6:.2f} USDC. Repay debt before closing."
-                )
-        except:
-            pass
 
-        if st.button(
-            "Close Account",
-            type="secondary",
-            use_container_width=True,
-            key="close_account_btn",
-        ):
-            try:
-                with st.spinner("Closing credit account..."):
-                    result = controller.close_credit_account(
-                        credit_account=st.session_state.credit_account,
-                        account_index=account_index,
-                    )
+close_account_fragment()
 
-                    if result.get("success"):
-                        st.session_state.credit_account = None
-                        log_transaction("Close Account", result, success=True)
-                        fork_client.mine_blocks(
-                            1
-                        )  # Advance one block after successful action
-                        set_flash_success(
-                            "🎉 **Success!** Credit account closed!",
-                            tx_hash=result.get("tx_hash"),
-                        )
-                        st.rerun()
-                    else:
-                        log_transaction("Close Account", result, success=False)
-                        set_flash_error(
-                            f"❌ Failed: {result.get('error', 'Unknown error')}"
-                        )
-                        st.rerun()
-            except Exception as e:
-                log_transaction(
-                    "Close Account", {"success": False, "error": str(e)}, success=False
-                )
-                set_flash_error(f"❌ Error: {str(e)}")
-                st.rerun()
 
 # Transaction log
 st.divider()
 with st.expander("📜 Transaction Log", expanded=False):
     if st.session_state.transaction_log:
         for log in st.session_state.transaction_log:
-            timestamp = log.get("timestamp", "N/A")
+            timestamp = _fmt_ts(log.get("timestamp"))
             action = log.get("action", "Unknown")
             success = log.get("success", False)
             tx_hash = log.get("tx_hash")
@@ -5,18 +5,56 @@ Preparation functions are pure (no side effects), while execution functions
 handle transaction building, signing, and sending to the blockchain.
 """
 
-import time
+import functools
+import re
 from typing import Dict, Any, List, Optional
+from eth_abi import encode as abi_encode
 from web3 import Web3
+from web3.exceptions import TimeExhausted
 from eth_account import Account
 
-from .contracts import ContractManager
+from .contracts import ContractManager, checksum_address
 from .config import CREDIT_FACADE_V3, USDC
 from .anvil_accounts import get_private_key
 
 # Constants
 MAX_UINT256 = 2**256 - 1
 
+# CreditFacadeV3 multicall selectors; the prepare_* helpers encode their
+# arguments with eth_abi directly instead of going through the contract ABI
+ADD_COLLATERAL_SELECTOR = Web3.keccak(text="addCollateral(address,uint256)")[:4]
+INCREASE_DEBT_SELECTOR = Web3.keccak(text="increaseDebt(uint256)")[:4]
+DECREASE_DEBT_SELECTOR = Web3.keccak(text="decreaseDebt(uint256)")[:4]
+WITHDRAW_COLLATERAL_SELECTOR = Web3.keccak(
+    text="withdrawCollateral(address,uint256,address)"
+)[:4]
+
+
+# OpenCreditAccount(creditAccount, onBehalfOf, caller, referralCode) event topic
+OPEN_CREDIT_ACCOUNT_TOPIC = Web3.keccak(
+    text="OpenCreditAccount(address,address,address,uint256)"
+)
+
+# Custom error selector embedded in a revert message: "0x" + 4 bytes
+_SELECTOR_RE = re.compile(r"0x([0-9a-fA-F]{8})")
+
+# Known Gearbox custom error selectors
+_ERROR_MAP = {
+    "0x16dd0ffb": "UnknownMethodException (selector not recognized)",
+    "0xce167994": "BorrowAmountOutOfLimitsException",
+    "0x20328066": "UpdateQuotaOnZeroDebtAccountException",
+    "0xba04a99a": "QuotaIsOutOfBoundsException",
+    "0x51bb745d": "DebtToZeroWithActiveQuotasException",
+    "0xf4059071": "ERC20 transfer/approve error",
+    "0x675f1a56": "BorrowedBlockLimitException",
+    "0x9abfd950": "CreditManagerCantBorrowException",
+}
+
+
+def _calldata(selector: bytes, types: List[str], args: List[Any]) -> str:
+    """0x-hex calldata for selector + ABI-encoded args"""
+    return "0x" + (selector + abi_encode(types, args)).hex()
+
 
 # ============================================================================
 # Transaction Preparation Functions (Pure - No Side Effects)
@@ -39,12 +77,11 @@ def prepare_add_collateral(
     Returns:
         Dict with "target" and "callData" keys
     """
-    credit_facade = contract_manager.get_credit_facade(CREDIT_FACADE_V3)
-    token_address = Web3.to_checksum_address(token_address)
+    token_address = checksum_address(token_address)
 
-    call_data = credit_facade.functions.addCollateral(
-        token_address, amount
-    )._encode_transaction_data()
+    call_data = _calldata(
+        ADD_COLLATERAL_SELECTOR, ["address", "uint256"], [token_address, amount]
+    )
 
     return {
         "target": CREDIT_FACADE_V3,
@@ -69,9 +106,7 @@ def prepare_increase_debt(
     Returns:
         Dict with "target" and "callData" keys
     """
-    credit_facade = contract_manager.get_credit_facade(CREDIT_FACADE_V3)
-
-    call_data = credit_facade.functions.increaseDebt(amount)._encode_transaction_data()
+    call_data = _calldata(INCREASE_DEBT_SELECTOR, ["uint256"], [amount])
 
     return {
         "target": CREDIT_FACADE_V3,
@@ -95,9 +130,7 @@ def prepare_decrease_debt(
     Returns:
         Dict with "target" and "callData" keys
     """
-    credit_facade = contract_manager.get_credit_facade(CREDIT_FACADE_V3)
-
-    call_data = credit_facade.functions.decreaseDebt(amount)._encode_transaction_data()
+    call_data = _calldata(DECREASE_DEBT_SELECTOR, ["uint256"], [amount])
 
     return {
         "target": CREDIT_FACADE_V3,
@@ -107,6 +140,10 @@ def prepare_decrease_debt(
     }
 
 
+# The repay-all call is the same bytes every time, so encode it once
+_REPAY_ALL_CALL = prepare_decrease_debt(None, MAX_UINT256)
+
+
 def prepare_withdraw_collateral(
     contract_manager: ContractManager,
     token_address: str,
@@ -125,13 +162,14 @@ def prepare_withdraw_collateral(
     Returns:
         Dict with "target" and "callData" keys
     """
-    credit_facade = contract_manager.get_credit_facade(CREDIT_FACADE_V3)
-    token_address = Web3.to_checksum_address(token_address)
-    to_address = Web3.to_checksum_address(to_address)
+    token_address = checksum_address(token_address)
+    to_address = checksum_address(to_address)
 
-    call_data = credit_facade.functions.withdrawCollateral(
-        token_address, amount, to_address
-    )._encode_transaction_data()
+    call_data = _calldata(
+        WITHDRAW_COLLATERAL_SELECTOR,
+        ["address", "uint256", "address"],
+        [token_address, amount, to_address],
+    )
 
     return {
         "target": CREDIT_FACADE_V3,
@@ -157,10 +195,8 @@ def prepare_repay_all_debt(
     Returns:
         List with single call dict to repay all debt
     """
-    # Repay all debt
-    repay_call = prepare_decrease_debt(contract_manager, MAX_UINT256)
-
-    return [repay_call]
+    # decreaseDebt(MAX_UINT256) never changes; copy so callers can't mutate it
+    return [dict(_REPAY_ALL_CALL)]
 
 
 # ============================================================================
@@ -169,14 +205,16 @@ def prepare_repay_all_debt(
 
 
 def wait_for_tx(w3: Web3, tx_hash, max_wait: int = 30):
-    """Wait for transaction receipt"""
-    for i in range(max_wait):
-        try:
-            receipt = w3.eth.get_transaction_receipt(tx_hash)
-            return receipt
-        except:
-            time.sleep(1)
-    return None
+    """Wait for transaction receipt, or None if it isn't mined within max_wait.
+
+    Anvil automines on send, so the first receipt lookup usually succeeds.
+    """
+    try:
+        return w3.eth.wait_for_transaction_receipt(
+            tx_hash, timeout=max_wait, poll_latency=0.05
+        )
+    except TimeExhausted:
+        return None
 
 
 def extract_revert_reason(w3: Web3, tx_hash: str) -> str:
@@ -191,11 +229,24 @@ def extract_revert_reason(w3: Web3, tx_hash: str) -> str:
         Revert reason string or error message
     """
     try:
-        # Try to get revert reason using debug_traceTransaction (Anvil specific)
-        trace = w3.provider.make_request(
-            "debug_traceTransaction",
-            [tx_hash, {"tracer": "callTracer", "tracerConfig": {"withLog": True}}],
+        # Trace (Anvil specific) and the tx itself in one JSON-RPC batch; the
+        # tx is only needed for the eth_call replay fallback below
+        responses = w3.provider.make_batch_request(
+            [
+                (
+                    "debug_traceTransaction",
+                    [
+                        tx_hash,
+                        {"tracer": "callTracer", "tracerConfig": {"withLog": True}},
+                    ],
+                ),
+                ("eth_getTransaction", [tx_hash]),
+            ]
         )
+        if not isinstance(responses, list):
+            # The node rejected the whole batch with a single error
+            responses = [responses, responses]
+        trace, tx_response = responses
 
         if trace and "result" in trace:
             result = trace["result"]
@@ -217,16 +268,12 @@ def extract_revert_reason(w3: Web3, tx_hash: str) -> str:
                     ):  # Error(string) selector
                         # Decode error string
                         try:
-                            # Skip selector (4 bytes) and offset (32 bytes)
-                            error_data = output[10:]  # Skip 0x and selector
-                            # Get string length (next 32 bytes)
-                            str_len_hex = error_data[64:128]
-                            str_len = int(str_len_hex, 16)
-                            # Get string data
-                            str_data_hex = error_data[128 : 128 + (str_len * 2)]
-                            # Convert hex to string
+                            raw = bytes.fromhex(output[2:])
+                            # Offset of the string, relative to the args
+                            start = 4 + int.from_bytes(raw[4:36], "big")
+                            str_len = int.from_bytes(raw[start : start + 32], "big")
                             error_str = (
-                                bytes.fromhex(str_data_hex)
+                                raw[start + 32 : start + 32 + str_len]
                                 .decode("utf-8")
                                 .rstrip("\x00")
                             )
@@ -234,23 +281,23 @@ def extract_revert_reason(w3: Web3, tx_hash: str) -> str:
                         except:
                             pass
 
-        # Fallback: try to get error from receipt
+        # Fallback: replay the mined tx as a call on the block before it
         try:
-            receipt = w3.eth.get_transaction_receipt(tx_hash)
-            if receipt and receipt.status == 0:
-                # Try to call the transaction to get revert reason
-                tx = w3.eth.get_transaction(tx_hash)
+            tx = tx_response.get("result")
+            if tx and tx.get("blockNumber"):
                 try:
+                    # Raw eth_getTransaction JSON has lowercase addresses,
+                    # which web3 rejects in a call
                     w3.eth.call(
                         {
-                            "to": tx["to"],
+                            "to": checksum_address(tx["to"]),
                             "data": tx["input"],
-                            "from": tx["from"],
-                            "gas": tx["gas"],
-                            "gasPrice": tx.get("gasPrice", 0),
-                            "value": tx.get("value", 0),
+                            "from": checksum_address(tx["from"]),
+                            "gas": int(tx["gas"], 16),
+                            "gasPrice": int(tx.get("gasPrice", "0x0"), 16),
+                            "value": int(tx.get("value", "0x0"), 16),
                         },
-                        tx["blockNumber"] - 1,
+                        int(tx["blockNumber"], 16) - 1,
                     )
                 except Exception as call_error:
                     error_str = str(call_error)
@@ -265,42 +312,84 @@ def extract_revert_reason(w3: Web3, tx_hash: str) -> str:
         return f"Could not extract revert reason: {str(e)}"
 
 
-def get_base_fee(w3: Web3) -> int:
-    """Get base fee from latest block"""
-    latest_block = w3.eth.get_block("latest")
-    return latest_block.get("baseFeePerGas", 0) if latest_block else 0
-
-
 def build_transaction(
     w3: Web3,
     account_address: str,
     func_call,
     gas: int = 500000,
+    latest_block: Optional[Dict[str, Any]] = None,
+    nonce: Optional[int] = None,
 ) -> Dict[str, Any]:
-    """Build transaction with proper gas fees"""
-    base_fee = get_base_fee(w3)
-    return func_call.build_transaction(
-        {
-            "from": account_address,
-            "gas": gas,
-            "maxFeePerGas": max(base_fee, 1000000000),  # 1 gwei minimum
-            "maxPriorityFeePerGas": 0,
-            "nonce": w3.eth.get_transaction_count(account_address),
-        }
-    )
+    """Build transaction with proper gas fees
+
+    Pass latest_block and nonce if they were already fetched (e.g. batched
+    with other reads) to skip looking them up again.
+    """
+    # Every field is supplied, so web3 has no defaults left to fetch
+    tx = _tx_params(w3, account_address, gas, latest_block, nonce)
+    tx.update({"value": 0, "chainId": w3.eth.chain_id})
+    return func_call.build_transaction(tx)
+
+
+def build_raw_transaction(
+    w3: Web3,
+    account_address: str,
+    to: str,
+    data: str,
+    gas: int = 500000,
+    latest_block: Optional[Dict[str, Any]] = None,
+    nonce: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Build transaction from already-encoded calldata (skips the ABI layer)"""
+    tx = _tx_params(w3, account_address, gas, latest_block, nonce)
+    tx.update({"to": to, "data": data, "value": 0, "chainId": w3.eth.chain_id})
+    return tx
+
+
+def _tx_params(
+    w3: Web3,
+    account_address: str,
+    gas: int,
+    latest_block: Optional[Dict[str, Any]] = None,
+    nonce: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Sender, gas, EIP-1559 fee and nonce fields shared by both builders"""
+    if latest_block is None or nonce is None:
+        # Latest block (for the base fee) and nonce in one JSON-RPC batch
+        with w3.batch_requests() as batch:
+            batch.add(w3.eth.get_block("latest"))
+            batch.add(w3.eth.get_transaction_count(account_address))
+            fetched_block, fetched_nonce = batch.execute()
+        if latest_block is None:
+            latest_block = fetched_block
+        if nonce is None:
+            nonce = fetched_nonce
+    base_fee = latest_block.get("baseFeePerGas", 0) if latest_block else 0
+    return {
+        "from": account_address,
+        "gas": gas,
+        "maxFeePerGas": max(base_fee, 1000000000),  # 1 gwei minimum
+        "maxPriorityFeePerGas": 0,
+        "nonce": nonce,
+    }
+
+
+@functools.lru_cache(maxsize=32)
+def _account_from_key(private_key: str) -> Account:
+    """Derive an account from a private key (secp256k1 work done once per key)"""
+    return Account.from_key(private_key)
 
 
 def get_account(
     account_index: Optional[int] = None, private_key: Optional[str] = None
 ) -> Account:
     """Get account from index or private key"""
-    from eth_account import Account
     import secrets
 
     if private_key:
-        return Account.from_key(private_key)
+        return _account_from_key(private_key)
     elif account_index is not None:
-        return Account.from_key(get_private_key(account_index))
+        return _account_from_key(get_private_key(account_index))
     else:
         # Generate fresh account
         private_key = "0x" + secrets.token_hex(32)
@@ -334,35 +423,29 @@ def execute_multicall(
 
     account = get_account(account_index, private_key)
     account_address = account.address
-    credit_account = w3.to_checksum_address(credit_account)
+    credit_account = checksum_address(credit_account)
 
     # Extract just target and callData for multicall
-    # _encode_transaction_data() returns bytes, but web3.py expects hex strings for tuple encoding
+    # web3.py expects 0x-hex strings for tuple encoding; prepared calls
+    # already carry one, so only bytes or unprefixed hex need converting
     multicall_calls = []
     for call in calls:
         call_data = call["callData"]
-        # Ensure callData is bytes (from _encode_transaction_data)
-        if isinstance(call_data, str):
-            # If it's a hex string, convert to bytes first, then back to hex for web3
-            if call_data.startswith("0x"):
-                call_data_bytes = bytes.fromhex(call_data[2:])
-            else:
-                call_data_bytes = bytes.fromhex(call_data)
-            call_data = call_data_bytes
-
-        # Web3.py expects hex strings for tuple encoding in .call()
-        call_data_hex = (
-            "0x" + call_data.hex() if isinstance(call_data, bytes) else call_data
-        )
+        if isinstance(call_data, (bytes, bytearray)):
+            call_data_hex = "0x" + call_data.hex()
+        elif call_data.startswith("0x"):
+            call_data_hex = call_data
+        else:
+            call_data_hex = "0x" + call_data
 
         multicall_calls.append(
             {
-                "target": w3.to_checksum_address(call["target"]),
+                "target": checksum_address(call["target"]),
                 "callData": call_data_hex,
             }
         )
 
-    credit_facade = contract_manager.get_credit_facade(CREDIT_FACADE_V3)
+    credit_facade = contract_manager.credit_facade
 
     try:
         tx = build_transaction(
@@ -419,7 +502,7 @@ def execute_open_account(
     if on_behalf_of is None:
         on_behalf_of = account_address
     else:
-        on_behalf_of = w3.to_checksum_address(on_behalf_of)
+        on_behalf_of = checksum_address(on_behalf_of)
 
     # Extract just target and callData for multicall
     multicall_calls = [
@@ -427,7 +510,7 @@ def execute_open_account(
         for call in (calls or [])
     ]
 
-    credit_facade = contract_manager.get_credit_facade(CREDIT_FACADE_V3)
+    credit_facade = contract_manager.credit_facade
 
     try:
         tx = build_transaction(
@@ -448,10 +531,9 @@ def execute_open_account(
             return {"success": False, "error": revert_reason, "tx_hash": tx_hash.hex()}
 
         # Extract credit account from event
-        event_sig = w3.keccak(text="OpenCreditAccount(address,address,address,uint256)")
         credit_account = None
         for log in receipt.logs:
-            if len(log.topics) > 0 and log.topics[0] == event_sig:
+            if log.topics and log.topics[0] == OPEN_CREDIT_ACCOUNT_TOPIC:
                 credit_account = w3.to_checksum_address(
                     "0x" + log.topics[1].hex()[-40:]
                 )
@@ -494,14 +576,14 @@ def simulate_multicall(
     Returns:
         Dict with success and simulation result
     """
-    credit_account = w3.to_checksum_address(credit_account)
+    credit_account = checksum_address(credit_account)
 
     # Extract just target and callData
     multicall_calls = [
         {"target": call["target"], "callData": call["callData"]} for call in calls
     ]
 
-    credit_facade = contract_manager.get_credit_facade(CREDIT_FACADE_V3)
+    credit_facade = contract_manager.credit_facade
 
     try:
         result = credit_facade.functions.multicall(
@@ -542,27 +624,14 @@ def simulate_multicall(
 
         # Try to extract error selector if it's a custom error
         if "execution reverted" in error_msg.lower() or "selector" not in error_details:
-            import re
-
-            # Pattern: "0x" followed by 8 hex characters (4 bytes)
-            selector_match = re.search(r"0x([0-9a-fA-F]{8})", error_msg)
+            selector_match = _SELECTOR_RE.search(error_msg)
             if selector_match:
                 error_details["selector"] = selector_match.group(0)
 
         # Map known selectors to error names
         if "selector" in error_details:
             selector = error_details["selector"]
-            error_map = {
-                "0x16dd0ffb": "UnknownMethodException (selector not recognized)",
-                "0xce167994": "BorrowAmountOutOfLimitsException",
-                "0x20328066": "UpdateQuotaOnZeroDebtAccountException",
-                "0xba04a99a": "QuotaIsOutOfBoundsException",
-                "0x51bb745d": "DebtToZeroWithActiveQuotasException",
-                "0xf4059071": "ERC20 transfer/approve error",
-                "0x675f1a56": "BorrowedBlockLimitException",
-                "0x9abfd950": "CreditManagerCantBorrowException",
-            }
-            error_name = error_map.get(selector, f"Custom error {selector}")
+            error_name = _ERROR_MAP.get(selector, f"Custom error {selector}")
             error_msg = f"{error_name}: {error_msg}"
             error_details["error_name"] = error_name
 
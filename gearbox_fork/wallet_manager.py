@@ -1,14 +1,25 @@
 """Simple wallet funding using Anvil"""
 
-import time
+import logging
+from typing import List, Optional, Sequence, Set, Tuple
+from eth_abi import encode as abi_encode
 from web3 import Web3
+from web3.exceptions import TransactionNotFound
 
 from .fork_client import ForkClient
-from .anvil_accounts import get_address, get_private_key
+from .anvil_accounts import get_address
 from .config import USDC
-from .contracts import ContractManager
-from .transactions import build_transaction, wait_for_tx
-from eth_account import Account
+from .contracts import (
+    ContractManager,
+    checksum_address,
+    encode_allowance,
+    encode_approve,
+    encode_balance_of,
+)
+from .multicall import aggregate, aggregate3_tx, decode_aggregate3, decode_uint256s
+from .transactions import build_raw_transaction, get_account, wait_for_tx
+
+logger = logging.getLogger(__name__)
 
 # Constants
 MAX_UINT256 = 2**256 - 1
@@ -20,6 +31,30 @@ USDC_WHALES = [
     "0x7713974908Be4BEd47172370115e8b121146F513",  # Another large holder
     "0x55FE002aefF02F77364de339a1292923A15844B8",  # Circle
 ]
+USDC_WHALES_CS = tuple(Web3.to_checksum_address(addr) for addr in USDC_WHALES)
+
+# Storage slot of each token's balances mapping, for fund_from_whale's opt-in
+# direct balance write (USDC FiatTokenV2_2: balanceAndBlacklistStates, slot 9)
+TOKEN_BALANCE_SLOTS = {
+    USDC: 9,
+}
+
+# Transfer(address indexed from, address indexed to, uint256 value)
+TRANSFER_TOPIC = Web3.keccak(text="Transfer(address,address,uint256)")
+
+
+def _transferred_to(receipt, token_address: str, recipient: str) -> Optional[int]:
+    """Amount of token sent to recipient according to the receipt's logs"""
+    recipient_topic = bytes(12) + bytes.fromhex(recipient[2:])
+    for log in receipt.logs:
+        if (
+            log.address == token_address
+            and len(log.topics) == 3
+            and log.topics[0] == TRANSFER_TOPIC
+            and log.topics[2] == recipient_topic
+        ):
+            return int.from_bytes(log.data, "big")
+    return None
 
 
 class WalletManager:
@@ -29,6 +64,8 @@ class WalletManager:
         self.fork_client = fork_client
         self.w3 = fork_client.w3
         self.cm = ContractManager(self.w3)
+        # (token, spender, owner) with a standing MAX_UINT256 approval
+        self._approved: Set[Tuple[str, str, str]] = set()
 
     def fund_wallet(
         self,
@@ -44,74 +81,241 @@ class WalletManager:
             eth_amount: Amount of ETH to fund (in wei)
             usdc_amount: Amount of USDC to fund (in wei, 6 decimals)
         """
-        from .anvil_accounts import get_private_key
-        from eth_account import Account
-
         account_address = get_address(account_index)
-        account = Account.from_key(get_private_key(account_index))
 
         # Ensure we have enough ETH for gas
+        error = None
         if eth_amount > 0:
-            self.fork_client.set_balance(account_address, eth_amount)
+            # Also caches the new balance, so it isn't read back
+            response = self.fork_client.set_balance(account_address, eth_amount)
+            error = response.get("error")
 
-        return {
+        eth_balance, usdc_balance = self._get_balances(account_address)
+        wallet = {
             "account": account_address,
-            "ETH": self.fork_client.get_balance(account_address),
-            "USDC": self._get_usdc_balance(account_address),
+            "ETH": eth_balance,
+            "USDC": usdc_balance,
         }
+        if error is not None:
+            wallet["error"] = error
+        return wallet
+
+    def fund_wallets_bulk(
+        self, account_indices: Sequence[int], eth_amount: int = 0
+    ) -> List[dict]:
+        """
+        Fund several Anvil accounts with ETH, like fund_wallet for each
+
+        All balance writes go out in one JSON-RPC batch and all reads in a
+        second one, instead of a few round trips per account.
+
+        Args:
+            account_indices: Anvil account indices (0-9)
+            eth_amount: Amount of ETH to fund each account with (in wei)
+
+        Returns:
+            One fund_wallet-style dict per account, in order
+        """
+        addresses = [get_address(i) for i in account_indices]
+        eth_balances = {}
+        errors = {}
+        if eth_amount > 0:
+            responses = self.w3.provider.make_batch_request(
+                [("anvil_setBalance", [addr, hex(eth_amount)]) for addr in addresses]
+            )
+            # A rejected batch comes back as a single error response
+            if not isinstance(responses, list):
+                responses = [responses] * len(addresses)
+            self.fork_client.bump_state_version()
+            for addr, response in zip(addresses, responses):
+                if "error" in response:
+                    # Left out of eth_balances so the real balance is read
+                    errors[addr] = response["error"]
+                    continue
+                self._store_balance("eth", addr, eth_amount)
+                eth_balances[addr] = eth_amount
+        else:
+            for addr in addresses:
+                balance = self._lookup_balance("eth", addr)
+                if balance is not None:
+                    eth_balances[addr] = balance
+
+        # Uncached ETH balances plus every USDC balance (one Multicall3 call)
+        missing_eth = [addr for addr in addresses if addr not in eth_balances]
+        with self.w3.batch_requests() as batch:
+            for addr in missing_eth:
+                batch.add(self.w3.eth.get_balance(addr))
+            batch.add(
+                self.w3.eth.call(
+                    aggregate3_tx(
+                        self.w3, [(USDC, encode_balance_of(addr)) for addr in addresses]
+                    )
+                )
+            )
+            results = batch.execute()
+        for addr, balance in zip(missing_eth, results):
+            self._store_balance("eth", addr, balance)
+            eth_balances[addr] = balance
+        usdc_balances = decode_uint256s(
+            self.w3, decode_aggregate3(self.w3, results[-1])
+        )
+
+        wallets = []
+        for addr, usdc_balance in zip(addresses, usdc_balances):
+            self._store_balance("usdc", addr, usdc_balance)
+            wallet = {"account": addr, "ETH": eth_balances[addr], "USDC": usdc_balance}
+            if addr in errors:
+                wallet["error"] = errors[addr]
+            wallets.append(wallet)
+        return wallets
 
     def get_wallet_balances(self, account_index: int) -> dict:
         """Get all balances (ETH, USDC) for an account"""
         account_address = get_address(account_index)
 
+        eth_balance, usdc_balance = self._get_balances(account_address)
         return {
             "account": account_address,
-            "ETH": self.fork_client.get_balance(account_address),
-            "USDC": self._get_usdc_balance(account_address),
+            "ETH": eth_balance,
+            "USDC": usdc_balance,
         }
 
+    def _get_balances(self, account_address: str) -> Tuple[int, int]:
+        """ETH and USDC balances; if neither is cached, read both in one batch"""
+        eth_balance = self._lookup_balance("eth", account_address)
+        usdc_balance = self._lookup_balance("usdc", account_address)
+        if eth_balance is None and usdc_balance is None:
+            with self.w3.batch_requests() as batch:
+                batch.add(self.w3.eth.get_balance(account_address))
+                batch.add(
+                    self.w3.eth.call(self._balance_of_call(USDC, account_address))
+                )
+                eth_balance, usdc_data = batch.execute()
+            usdc_balance = int.from_bytes(usdc_data, "big")
+            self._store_balance("eth", account_address, eth_balance)
+            self._store_balance("usdc", account_address, usdc_balance)
+        elif eth_balance is None:
+            eth_balance = self._get_eth_balance(account_address)
+        elif usdc_balance is None:
+            usdc_balance = self._get_usdc_balance(account_address)
+        return eth_balance, usdc_balance
+
     def _get_usdc_balance(self, account_address: str) -> int:
         """Get USDC balance"""
-        usdc_contract = self.w3.eth.contract(
-            address=USDC,
-            abi=[
-                {
-                    "constant": True,
-                    "inputs": [{"name": "_owner", "type": "address"}],
-                    "name": "balanceOf",
-                    "outputs": [{"name": "balance", "type": "uint256"}],
-                    "type": "function",
-                }
-            ],
+        balance = self._lookup_balance("usdc", account_address)
+        if balance is None:
+            balance = self._token_balance(USDC, account_address)
+            self._store_balance("usdc", account_address, balance)
+        return balance
+
+    @staticmethod
+    def _balance_of_call(token_address: str, account_address: str) -> dict:
+        """Raw eth_call params for balanceOf (no contract/ABI layer)"""
+        return {"to": token_address, "data": encode_balance_of(account_address)}
+
+    def _token_balance(self, token_address: str, account_address: str) -> int:
+        """ERC20 balance via a raw eth_call"""
+        return int.from_bytes(
+            self.w3.eth.call(self._balance_of_call(token_address, account_address)),
+            "big",
+        )
+
+    def _get_eth_balance(self, account_address: str) -> int:
+        """Get ETH balance (cached by the fork client)"""
+        return self.fork_client.get_balance(account_address)
+
+    def _lookup_balance(self, kind: str, account_address: str) -> Optional[int]:
+        """Balance from the fork client's shared cache, if present"""
+        return self.fork_client.cached_balance(kind, account_address)
+
+    def _store_balance(self, kind: str, account_address: str, balance: int):
+        """Record a balance in the fork client's shared cache"""
+        self.fork_client.store_balance(kind, account_address, balance)
+
+    def _approval_key(
+        self, owner: str, token_address: str, spender: str
+    ) -> Tuple[str, str, str]:
+        """(token, spender, owner) key into the MAX approval set"""
+        return (
+            checksum_address(token_address),
+            checksum_address(spender),
+            checksum_address(owner),
         )
-        return usdc_contract.functions.balanceOf(account_address).call()
+
+    def is_approved(self, owner: str, token_address: str, spender: str) -> bool:
+        """Whether owner is known to have a standing MAX approval for spender"""
+        return self._approval_key(owner, token_address, spender) in self._approved
+
+    def get_balance_and_allowance(
+        self, owner: str, token_address: str, spender: str
+    ) -> Tuple[int, int]:
+        """Token balance of owner and its allowance to spender, in one eth_call
+
+        A MAX-sized allowance seen here is remembered for is_approved().
+        """
+        balance, allowance = decode_uint256s(
+            self.w3,
+            aggregate(
+                self.w3,
+                [
+                    (token_address, encode_balance_of(owner)),
+                    (token_address, encode_allowance(owner, spender)),
+                ],
+            ),
+        )
+        if allowance >= MAX_UINT256 // 2:
+            self._approved.add(self._approval_key(owner, token_address, spender))
+        return balance, allowance
 
     def fund_from_whale(
-        self, account_address: str, token_address: str, amount: int
+        self,
+        account_address: str,
+        token_address: str,
+        amount: int,
+        use_storage: bool = False,
     ) -> dict:
         """
-        Fund account from whale using impersonateAccount
+        Fund account with tokens transferred from a whale using impersonateAccount
 
         Args:
             account_address: Address to fund
             token_address: Token address (e.g., USDC)
             amount: Amount to transfer (in token's smallest unit)
+            use_storage: For tokens with a known balance slot, credit the
+                balance with a single anvil_setStorageAt instead. Faster, but
+                totalSupply is left unchanged and no Transfer event is emitted.
 
         Returns:
             Dict with success status, tx_hash, balance, and whale_address
         """
-        token_address = self.w3.to_checksum_address(token_address)
-        account_address = self.w3.to_checksum_address(account_address)
+        token_address = checksum_address(token_address)
+        account_address = checksum_address(account_address)
         token_contract = self.cm.get_erc20(token_address)
 
-        # Find whale with sufficient balance
-        whale_address = None
-        for addr in USDC_WHALES:
-            addr_checksum = self.w3.to_checksum_address(addr)
-            balance = token_contract.functions.balanceOf(addr_checksum).call()
-            if balance >= amount:
-                whale_address = addr_checksum
-                break
+        balance_slot = TOKEN_BALANCE_SLOTS.get(token_address) if use_storage else None
+        if balance_slot is not None:
+            return self._fund_via_storage(
+                account_address, token_contract, balance_slot, amount
+            )
+
+        # Find whale with sufficient balance; the recipient's current balance
+        # rides along in the same eth_call
+        *balances, balance_before = decode_uint256s(
+            self.w3,
+            aggregate(
+                self.w3,
+                [(token_address, encode_balance_of(addr)) for addr in USDC_WHALES_CS]
+                + [(token_address, encode_balance_of(account_address))],
+            ),
+        )
+        whale_address = next(
+            (
+                addr
+                for addr, balance in zip(USDC_WHALES_CS, balances)
+                if balance >= amount
+            ),
+            None,
+        )
 
         if not whale_address:
             return {
@@ -134,7 +338,8 @@ class WalletManager:
                 }
             )
             tx_hash = self.w3.eth.send_transaction(transfer_tx)
-            receipt = wait_for_tx(self.w3, tx_hash)
+            self.fork_client.mark_block_dirty()
+            receipt = self._mined_receipt(tx_hash)
 
             # Stop impersonating
             self.w3.provider.make_request(
@@ -144,12 +349,15 @@ class WalletManager:
             if not receipt or receipt.status == 0:
                 return {"success": False, "error": f"Transfer failed: {tx_hash.hex()}"}
 
-            # Verify balance
-            balance = token_contract.functions.balanceOf(account_address).call()
+            # The receipt's Transfer log has the amount received; no re-read
+            balance_delta = _transferred_to(receipt, token_address, account_address)
+            if balance_delta is None:
+                balance_delta = amount
             return {
                 "success": True,
                 "tx_hash": tx_hash.hex(),
-                "balance": balance,
+                "balance": balance_before + balance_delta,
+                "balance_delta": balance_delta,
                 "whale_address": whale_address,
             }
         except Exception as e:
@@ -158,10 +366,58 @@ class WalletManager:
                 self.w3.provider.make_request(
                     "anvil_stopImpersonatingAccount", [whale_address]
                 )
-            except:
-                pass
+            except Exception:
+                # The funding error below matters more; keep this one in the log
+                logger.debug(
+                    "Failed to stop impersonating %s", whale_address, exc_info=True
+                )
             return {"success": False, "error": str(e)}
 
+    def _fund_via_storage(
+        self, account_address: str, token_contract, balance_slot: int, amount: int
+    ) -> dict:
+        """Add amount to account's token balance by writing its storage slot
+
+        Only the holder's balance changes: totalSupply is not updated and no
+        Transfer event is emitted.
+        """
+        balance = self._token_balance(token_contract.address, account_address) + amount
+        # Solidity mapping layout: keccak256(abi.encode(key, mapping slot))
+        slot = Web3.keccak(
+            abi_encode(["address", "uint256"], [account_address, balance_slot])
+        )
+        response = self.w3.provider.make_request(
+            "anvil_setStorageAt",
+            [
+                token_contract.address,
+                "0x" + slot.hex(),
+                "0x" + balance.to_bytes(32, "big").hex(),
+            ],
+        )
+        self.fork_client.bump_state_version()
+        if "error" in response:
+            return {"success": False, "error": str(response["error"])}
+
+        return {
+            "success": True,
+            "tx_hash": "N/A (storage set)",
+            "balance": balance,
+            "whale_address": None,
+        }
+
+    def _mined_receipt(self, tx_hash):
+        """Receipt of a just-sent tx, mining a block if the node hasn't
+
+        Anvil automines by default, so the first lookup normally succeeds;
+        with interval mining, force the block rather than poll for it.
+        """
+        try:
+            return self.w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            self.w3.provider.make_request("evm_mine", [])
+            self.fork_client.mark_block_dirty()
+        return wait_for_tx(self.w3, tx_hash)
+
     def approve_token(
         self,
         account_index: int,
@@ -182,32 +438,45 @@ class WalletManager:
             Dict with success status and tx_hash
         """
         account_address = get_address(account_index)
-        account = Account.from_key(get_private_key(account_index))
-        token_address = self.w3.to_checksum_address(token_address)
-        spender = self.w3.to_checksum_address(spender)
+        account = get_account(account_index)  # Key derivation cached per index
+        token_address = checksum_address(token_address)
+        spender = checksum_address(spender)
+
+        approval_key = self._approval_key(account_address, token_address, spender)
+        if approval_key in self._approved:
+            return {"success": True, "already_approved": True}
 
         token_contract = self.cm.get_erc20(token_address)
 
-        # Check current allowance
-        current_allowance = token_contract.functions.allowance(
-            account_address, spender
-        ).call()
+        # Current allowance plus the tx fields an approval would need, in one
+        # JSON-RPC batch. The nonce is read every time: the controller sends
+        # from the same accounts, so a locally counted one would go stale.
+        with self.w3.batch_requests() as batch:
+            batch.add(token_contract.functions.allowance(account_address, spender))
+            batch.add(self.w3.eth.get_block("latest"))
+            batch.add(self.w3.eth.get_transaction_count(account_address, "pending"))
+            current_allowance, latest_block, nonce = batch.execute()
+        if current_allowance >= MAX_UINT256 // 2:
+            self._approved.add(approval_key)
         if current_allowance >= amount:
             return {"success": True, "already_approved": True}
 
         # Approve with max amount
         max_approval = MAX_UINT256
         try:
-            tx = build_transaction(
+            tx = build_raw_transaction(
                 self.w3,
                 account_address,
-                token_contract.functions.approve(spender, max_approval),
+                token_address,
+                encode_approve(spender, max_approval),
                 gas=100000,
+                latest_block=latest_block,
+                nonce=nonce,
             )
-
             signed_tx = account.sign_transaction(tx)
             tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-            receipt = wait_for_tx(self.w3, tx_hash)
+            self.fork_client.mark_block_dirty()
+            receipt = self._mined_receipt(tx_hash)
 
             if not receipt or receipt.status == 0:
                 return {
@@ -215,6 +484,7 @@ class WalletManager:
                     "error": f"Approval transaction reverted: {tx_hash.hex()}",
                 }
 
+            self._approved.add(approval_key)
             return {"success": True, "tx_hash": tx_hash.hex()}
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -18,10 +18,23 @@ Run with: streamlit run gearbox_simulator.py
 """
 
 import streamlit as st
-from dataclasses import dataclass, field
-from typing import Dict, Optional, List
+from dataclasses import dataclass
+from typing import Callable, ClassVar, Dict, Iterator, List, Mapping, Optional, Tuple
 from datetime import datetime
 from enum import Enum
+from types import MappingProxyType
+import uuid
+
+
+# Risk parameters for every credit account
+LIQUIDATION_THRESHOLD = 0.95
+MAX_SAFE_LEVERAGE = 1.0 + LIQUIDATION_THRESHOLD
+MIN_HEALTH_FACTOR = 1.2  # To open or add borrow; below it an account is at risk
+LIQUIDATION_PENALTY = 0.05
+YEARN_APY = 0.08
+
+# Starting oracle prices, also what revert_price restores
+INITIAL_PRICES: Mapping[str, float] = MappingProxyType({"USDC": 1.0, "ETH": 3000.0})
 
 
 class AccountStatus(Enum):
@@ -30,21 +43,48 @@ class AccountStatus(Enum):
     LIQUIDATABLE = "liquidatable"
 
 
-@dataclass
 class Oracle:
-    """Simple price oracle"""
+    """Simple price oracle for the two simulated assets.
 
-    prices: Dict[str, float] = field(
-        default_factory=lambda: {"USDC": 1.0, "ETH": 3000.0}
-    )
+    Hot paths read ``eth``/``usdc`` directly; ``get_price`` is for callers
+    that only have the asset symbol.
+    """
+
+    __slots__ = ("eth", "usdc")
+
+    def __init__(
+        self,
+        eth: float = INITIAL_PRICES["ETH"],
+        usdc: float = INITIAL_PRICES["USDC"],
+    ):
+        self.eth = eth
+        self.usdc = usdc
+
+    @property
+    def prices(self) -> Dict[str, float]:
+        """Prices keyed by asset (read-only view)"""
+        return {"USDC": self.usdc, "ETH": self.eth}
 
     def get_price(self, asset: str) -> float:
-        return self.prices.get(asset, 0.0)
+        if asset == "USDC":
+            return self.usdc
+        if asset == "ETH":
+            return self.eth
+        return 0.0
+
+    def set_price(self, asset: str, price: float):
+        if asset == "USDC":
+            self.usdc = price
+        elif asset == "ETH":
+            self.eth = price
+        else:
+            raise ValueError(f"Unknown asset: {asset}")
 
     def drop_prices(self, percent: float):
         """Drop all prices by given percentage (for stress testing)"""
-        for asset in self.prices:
-            self.prices[asset] *= 1 - percent / 100
+        factor = 1 - percent / 100
+        self.eth *= factor
+        self.usdc *= factor
 
 
 @dataclass
@@ -68,6 +108,17 @@ class Pool:
     slope3: float = 0.30
     spread_fee: float = 0.05
 
+    def __post_init__(self):
+        # The curve parameters are fixed once the pool exists; precompute each
+        # segment's slope per unit of utilization and the rate at each kink
+        U1 = self.utilization_kink1
+        U2 = self.utilization_kink2
+        self._slope1_scale = self.slope1 / U1
+        self._slope2_scale = self.slope2 / (U2 - U1)
+        self._slope3_scale = self.slope3 / (1 - U2)
+        self._rate_at_kink1 = self.base_rate + self.slope1
+        self._rate_at_kink2 = self._rate_at_kink1 + self.slope2
+
     def utilization(self) -> float:
         if self.total_liquidity == 0:
             return 0.0
@@ -75,21 +126,18 @@ class Pool:
 
     def borrow_rate(self) -> float:
         util = self.utilization()
-        U1 = self.utilization_kink1
-        U2 = self.utilization_kink2
 
-        if util <= U1:
-            return self.base_rate + (util / U1) * self.slope1
-        elif util <= U2:
+        if util <= self.utilization_kink1:
+            return self.base_rate + util * self._slope1_scale
+        elif util <= self.utilization_kink2:
             return (
-                self.base_rate + self.slope1 + ((util - U1) / (U2 - U1)) * self.slope2
+                self._rate_at_kink1
+                + (util - self.utilization_kink1) * self._slope2_scale
             )
         else:
             return (
-                self.base_rate
-                + self.slope1
-                + self.slope2
-                + ((util - U2) / (1 - U2)) * self.slope3
+                self._rate_at_kink2
+                + (util - self.utilization_kink2) * self._slope3_scale
             )
 
     def effective_borrow_rate(self) -> float:
@@ -101,21 +149,21 @@ class YearnVaultStrategy:
     """Yearn USDC Vault strategy"""
 
     deposited_amount: float = 0.0  # Amount in USDC
-    yield_apy: float = 0.08
-    last_update: datetime = field(default_factory=datetime.now)
+    yield_apy: ClassVar[float] = YEARN_APY
+    last_update: Optional[datetime] = None  # Set on the first accrual
     rewards: float = 0.0
 
     def value(self) -> float:
         """Current value in USDC"""
         return self.deposited_amount
 
-    def accrue_yield(self, days: float):
+    def accrue_yield(self, days: float, now: Optional[datetime] = None):
         """Accrue yield over time period"""
         daily_rate = self.yield_apy / 365
         yield_amount = self.deposited_amount * daily_rate * days
         self.deposited_amount += yield_amount
         self.rewards += yield_amount
-        self.last_update = datetime.now()
+        self.last_update = now or datetime.now()
 
     def deposit(self, amount: float):
         """Deposit USDC into vault"""
@@ -140,9 +188,31 @@ class User:
     """Represents a user in the system"""
 
     address: str
-    wallet_balance: Dict[str, float] = field(
-        default_factory=lambda: {"USDC": 0.0, "ETH": 0.0}
-    )
+    usdc: float = 0.0
+    eth: float = 0.0
+
+    @property
+    def wallet_balance(self) -> Dict[str, float]:
+        """Balances keyed by asset (read-only view)"""
+        return {"USDC": self.usdc, "ETH": self.eth}
+
+    def balance(self, asset: str) -> float:
+        if asset == "USDC":
+            return self.usdc
+        if asset == "ETH":
+            return self.eth
+        return 0.0
+
+    def debit(self, asset: str, amount: float):
+        self.credit(asset, -amount)
+
+    def credit(self, asset: str, amount: float):
+        if asset == "USDC":
+            self.usdc += amount
+        elif asset == "ETH":
+            self.eth += amount
+        else:
+            raise ValueError(f"Unknown asset: {asset}")
 
 
 @dataclass
@@ -151,24 +221,35 @@ class CreditAccount:
 
     account_id: str
     owner: str
-    collateral: Dict[str, float] = field(default_factory=lambda: {"USDC": 0.0})
+    collateral_eth: float = 0.0
+    collateral_usdc: float = 0.0
     borrowed_amount: float = 0.0
     borrowed_asset: str = "USDC"
     accrued_interest: float = 0.0
-    liquidation_threshold: float = 0.95
+    liquidation_threshold: float = LIQUIDATION_THRESHOLD
     opened_at_block: int = 0
-    last_update: datetime = field(default_factory=datetime.now)
+    last_update: Optional[datetime] = None  # Set on the first accrual
     strategy: Optional[YearnVaultStrategy] = None
     is_liquidated: bool = False
     available_cash: float = (
         0.0  # Cash returned from strategy (can repay debt or redeploy)
     )
 
+    @property
+    def collateral(self) -> Dict[str, float]:
+        """Collateral amounts keyed by asset (read-only view)"""
+        return {"ETH": self.collateral_eth, "USDC": self.collateral_usdc}
+
+    def add_collateral(self, asset: str, amount: float):
+        if asset == "ETH":
+            self.collateral_eth += amount
+        elif asset == "USDC":
+            self.collateral_usdc += amount
+        else:
+            raise ValueError(f"Unsupported collateral asset: {asset}")
+
     def collateral_value_usd(self, oracle: Oracle) -> float:
-        total = 0.0
-        for asset, amount in self.collateral.items():
-            total += amount * oracle.get_price(asset)
-        return total
+        return self.collateral_eth * oracle.eth + self.collateral_usdc * oracle.usdc
 
     def debt_value_usd(self, oracle: Oracle) -> float:
         total_debt = self.borrowed_amount + self.accrued_interest
@@ -177,11 +258,11 @@ class CreditAccount:
     def strategy_value_usd(self, oracle: Oracle) -> float:
         if self.strategy is None:
             return 0.0
-        return self.strategy.value() * oracle.get_price("USDC")
+        return self.strategy.value() * oracle.usdc
 
     def total_position_value(self, oracle: Oracle) -> float:
         """Total value of account: collateral + strategy + available_cash - debt"""
-        available_cash_usd = self.available_cash * oracle.get_price("USDC")
+        available_cash_usd = self.available_cash * oracle.usdc
         return (
             self.collateral_value_usd(oracle)
             + self.strategy_value_usd(oracle)
@@ -196,23 +277,47 @@ class CreditAccount:
         debt = self.debt_value_usd(oracle)
         if debt == 0:
             return float("inf")
-        # Include available_cash as part of collateral (it's USDC that can repay debt)
-        available_cash_usd = self.available_cash * oracle.get_price("USDC")
-        total_collateral = (
-            self.collateral_value_usd(oracle)
-            + self.strategy_value_usd(oracle)
-            + available_cash_usd
+        return self._health_factor(
+            self.collateral_value_usd(oracle),
+            self.strategy_value_usd(oracle),
+            debt,
+            oracle.usdc,
         )
-        return (total_collateral * self.liquidation_threshold) / debt
+
+    def _health_factor(
+        self,
+        collateral_usd: float,
+        strategy_usd: float,
+        debt_usd: float,
+        usdc_price: float,
+    ) -> float:
+        """Health factor from already-priced components"""
+        if debt_usd == 0:
+            return float("inf")
+        # Include available_cash as part of collateral (it's USDC that can repay debt)
+        available_cash_usd = self.available_cash * usdc_price
+        total_collateral = collateral_usd + strategy_usd + available_cash_usd
+        return (total_collateral * self.liquidation_threshold) / debt_usd
 
     def status(self, oracle: Oracle) -> AccountStatus:
-        hf = self.health_factor(oracle)
-        if hf < 1.0:
-            return AccountStatus.LIQUIDATABLE
-        elif hf < 1.2:
-            return AccountStatus.AT_RISK
-        else:
-            return AccountStatus.HEALTHY
+        return status_for_health_factor(self.health_factor(oracle))
+
+
+# Indexed by _status_code(): 0 healthy, 1 at risk, 2 liquidatable
+_STATUS_BY_CODE = (
+    AccountStatus.HEALTHY,
+    AccountStatus.AT_RISK,
+    AccountStatus.LIQUIDATABLE,
+)
+_STATUS_STRS = tuple(status.value for status in _STATUS_BY_CODE)
+
+
+def _status_code(hf: float) -> int:
+    return (hf < MIN_HEALTH_FACTOR) + (hf < 1.0)
+
+
+def status_for_health_factor(hf: float) -> AccountStatus:
+    return _STATUS_BY_CODE[_status_code(hf)]
 
 
 class GearboxSimulator:
@@ -226,8 +331,21 @@ class GearboxSimulator:
             total_borrowed=200_000.0,
         )
         self.users: Dict[str, User] = {}
-        self.credit_accounts: Dict[str, CreditAccount] = {}
+        self._accounts_by_id: Dict[str, CreditAccount] = {}
+        # Read-only to callers; accounts are added through _add_account
+        self.credit_accounts: Mapping[str, CreditAccount] = MappingProxyType(
+            self._accounts_by_id
+        )
+        # Accounts not yet liquidated, in opening order; the per-step loops
+        # walk this instead of filtering every account on is_liquidated
+        self._live_accounts: List[CreditAccount] = []
         self.account_counter = 0
+        # Bumped by every method that changes accounts, the pool or prices;
+        # with sim_id it keys the page's cached views of this simulator
+        self.version = 0
+        self.sim_id = uuid.uuid4().hex
+        # (version, rows) from the last get_all_accounts call
+        self._accounts_snapshot: Optional[Tuple[int, List[Dict]]] = None
         self.current_block = 0
         self.blocks_per_year = 2_102_400
         self._init_dummy_accounts()
@@ -243,9 +361,7 @@ class GearboxSimulator:
 
         for name, collateral_eth, borrowed_usdc in dummy_users:
             user_address = f"0x{name.lower()}1"
-            self.create_user(
-                user_address, {"USDC": borrowed_usdc, "ETH": collateral_eth}
-            )
+            self.create_user(user_address, usdc=borrowed_usdc, eth=collateral_eth)
 
             self.account_counter += 1
             account_id = f"CA_{self.account_counter}"
@@ -259,17 +375,21 @@ class GearboxSimulator:
             account = CreditAccount(
                 account_id=account_id,
                 owner=user_address,
-                collateral={"ETH": collateral_eth},
+                collateral_eth=collateral_eth,
                 borrowed_amount=borrowed_usdc,
                 borrowed_asset="USDC",
                 opened_at_block=self.current_block,
                 strategy=strategy,
                 available_cash=0,
             )
-            self.credit_accounts[account_id] = account
+            self._add_account(account)
+
+    def _add_account(self, account: CreditAccount):
+        self._accounts_by_id[account.account_id] = account
+        self._live_accounts.append(account)
 
-    def create_user(self, address: str, initial_balance: Dict[str, float]) -> User:
-        user = User(address=address, wallet_balance=initial_balance.copy())
+    def create_user(self, address: str, usdc: float = 0.0, eth: float = 0.0) -> User:
+        user = User(address=address, usdc=usdc, eth=eth)
         self.users[address] = user
         return user
 
@@ -287,7 +407,7 @@ class GearboxSimulator:
             raise ValueError(f"User {user_address} not found")
 
         user = self.users[user_address]
-        if user.wallet_balance.get(collateral_asset, 0.0) < collateral_amount:
+        if user.balance(collateral_asset) < collateral_amount:
             raise ValueError(f"Insufficient {collateral_asset} balance")
 
         available = self.pool.total_liquidity - self.pool.total_borrowed
@@ -299,37 +419,35 @@ class GearboxSimulator:
         self.account_counter += 1
         account_id = f"CA_{self.account_counter}"
 
-        leverage = (
-            collateral_amount * self.oracle.get_price(collateral_asset) + borrow_amount
-        ) / (collateral_amount * self.oracle.get_price(collateral_asset))
+        leverage = 1.0 + borrow_amount / (
+            collateral_amount * self.oracle.get_price(collateral_asset)
+        )
+        if leverage > MAX_SAFE_LEVERAGE:
+            raise ValueError(
+                f"Leverage {leverage:.2f}x too high. Maximum safe leverage: {MAX_SAFE_LEVERAGE:.2f}x"
+            )
 
         account = CreditAccount(
             account_id=account_id,
             owner=user_address,
-            collateral={collateral_asset: collateral_amount},
             borrowed_amount=borrow_amount,
             borrowed_asset="USDC",
             opened_at_block=self.current_block,
             available_cash=borrow_amount,  # Borrowed money is available to deploy
         )
-
-        min_hf = 1.2
-        max_safe_leverage = 1.0 + account.liquidation_threshold
-        if leverage > max_safe_leverage:
-            raise ValueError(
-                f"Leverage {leverage:.2f}x too high. Maximum safe leverage: {max_safe_leverage:.2f}x"
-            )
+        account.add_collateral(collateral_asset, collateral_amount)
 
         hf = account.health_factor(self.oracle)
-        if hf < min_hf:
+        if hf < MIN_HEALTH_FACTOR:
             raise ValueError(
                 f"Health factor too low: {hf:.3f}. Reduce leverage or increase collateral."
             )
 
-        user.wallet_balance[collateral_asset] -= collateral_amount
+        user.debit(collateral_asset, collateral_amount)
         self.pool.total_borrowed += borrow_amount
-        self.credit_accounts[account_id] = account
+        self._add_account(account)
 
+        self.version += 1
         return {
             "action": "borrow",
             "account_id": account_id,
@@ -345,26 +463,28 @@ class GearboxSimulator:
         if user_address not in self.users:
             raise ValueError(f"User {user_address} not found")
 
-        if account_id not in self.credit_accounts:
+        account = self.credit_accounts.get(account_id)
+        if account is None:
             raise ValueError(f"Credit account {account_id} not found")
 
-        account = self.credit_accounts[account_id]
-        if account.owner != user_address:
-            raise ValueError("User does not own this credit account")
-
+        # Cheapest rejections first
         if account.is_liquidated:
             raise ValueError("Cannot deploy to liquidated account")
 
-        if account.strategy is None:
-            account.strategy = YearnVaultStrategy()
-
         available = account.available_cash
         if available <= 0:
             raise ValueError("No funds available to deploy")
 
+        if account.owner != user_address:
+            raise ValueError("User does not own this credit account")
+
+        if account.strategy is None:
+            account.strategy = YearnVaultStrategy()
+
         account.strategy.deposit(available)
         account.available_cash = 0
 
+        self.version += 1
         return {
             "action": "deploy_to_strategy",
             "account_id": account_id,
@@ -377,25 +497,27 @@ class GearboxSimulator:
         if user_address not in self.users:
             raise ValueError(f"User {user_address} not found")
 
-        if account_id not in self.credit_accounts:
+        account = self.credit_accounts.get(account_id)
+        if account is None:
             raise ValueError(f"Credit account {account_id} not found")
 
-        account = self.credit_accounts[account_id]
-        if account.owner != user_address:
-            raise ValueError("User does not own this credit account")
-
+        # Cheapest rejections first
         if account.is_liquidated:
             raise ValueError("Cannot withdraw from liquidated account")
 
         if account.strategy is None:
             raise ValueError("No strategy to withdraw from")
 
-        if account.strategy.value() <= 0:
+        if account.strategy.deposited_amount <= 0:
             raise ValueError("No funds in strategy to withdraw")
 
+        if account.owner != user_address:
+            raise ValueError("User does not own this credit account")
+
         withdrawn = account.strategy.withdraw()
         account.available_cash += withdrawn
 
+        self.version += 1
         return {
             "action": "withdraw_from_strategy",
             "account_id": account_id,
@@ -408,30 +530,40 @@ class GearboxSimulator:
         if user_address not in self.users:
             raise ValueError(f"User {user_address} not found")
 
-        if account_id not in self.credit_accounts:
+        account = self.credit_accounts.get(account_id)
+        if account is None:
             raise ValueError(f"Credit account {account_id} not found")
 
-        account = self.credit_accounts[account_id]
-        if account.owner != user_address:
-            raise ValueError("User does not own this credit account")
-
+        # Cheapest rejections first
         if account.is_liquidated:
             raise ValueError("Cannot repay on liquidated account")
 
-        total_debt = account.total_debt()
         borrowed_principal = account.borrowed_amount  # Save before resetting
-
+        total_debt = borrowed_principal + account.accrued_interest
         if account.available_cash < total_debt:
             raise ValueError(
                 f"Insufficient funds. Available: ${account.available_cash:,.2f}, Debt: ${total_debt:,.2f}"
             )
 
+        if account.owner != user_address:
+            raise ValueError("User does not own this credit account")
+
+        if total_debt == 0:
+            # Nothing owed: no account, pool or version change
+            return {
+                "action": "repay_debt",
+                "account_id": account_id,
+                "debt_repaid": total_debt,
+                "available_remaining": account.available_cash,
+            }
+
         account.available_cash -= total_debt
         account.borrowed_amount = 0
         account.accrued_interest = 0
         # Only reduce pool's total_borrowed by principal, not interest
         self.pool.total_borrowed -= borrowed_principal
 
+        self.version += 1
         return {
             "action": "repay_debt",
             "account_id": account_id,
@@ -447,7 +579,7 @@ class GearboxSimulator:
             raise ValueError(f"User {user_address} not found")
 
         user = self.users[user_address]
-        if user.wallet_balance.get(asset, 0.0) < amount:
+        if user.balance(asset) < amount:
             raise ValueError(f"Insufficient {asset} balance")
 
         if account_id not in self.credit_accounts:
@@ -460,11 +592,12 @@ class GearboxSimulator:
         if account.is_liquidated:
             raise ValueError("Cannot add collateral to liquidated account")
 
-        user.wallet_balance[asset] -= amount
-        account.collateral[asset] = account.collateral.get(asset, 0.0) + amount
+        user.debit(asset, amount)
+        account.add_collateral(asset, amount)
 
         hf = account.health_factor(self.oracle)
 
+        self.version += 1
         return {
             "action": "add_collateral",
             "account_id": account_id,
@@ -478,13 +611,11 @@ class GearboxSimulator:
         if user_address not in self.users:
             raise ValueError(f"User {user_address} not found")
 
-        if account_id not in self.credit_accounts:
+        account = self.credit_accounts.get(account_id)
+        if account is None:
             raise ValueError(f"Credit account {account_id} not found")
 
-        account = self.credit_accounts[account_id]
-        if account.owner != user_address:
-            raise ValueError("User does not own this credit account")
-
+        # Cheapest rejections first
         if account.is_liquidated:
             raise ValueError("Cannot add borrow to liquidated account")
 
@@ -494,25 +625,29 @@ class GearboxSimulator:
                 f"Insufficient pool liquidity. Available: {available:,.2f}"
             )
 
+        if account.owner != user_address:
+            raise ValueError("User does not own this credit account")
+
         account.borrowed_amount += amount
         account.available_cash += amount  # Add borrowed funds to available cash
         self.pool.total_borrowed += amount
 
         hf = account.health_factor(self.oracle)
-        if hf < 1.2:
+        if hf < MIN_HEALTH_FACTOR:
             account.borrowed_amount -= amount
             account.available_cash -= (
                 amount  # Revert available cash if health factor check fails
             )
             self.pool.total_borrowed -= amount
             raise ValueError(
-                f"Health factor would be too low: {hf:.3f}. Need HF >= 1.2"
+                f"Health factor would be too low: {hf:.3f}. Need HF >= {MIN_HEALTH_FACTOR}"
             )
 
-        leverage = (
-            account.collateral_value_usd(self.oracle) + account.borrowed_amount
-        ) / account.collateral_value_usd(self.oracle)
+        leverage = 1.0 + account.borrowed_amount / account.collateral_value_usd(
+            self.oracle
+        )
 
+        self.version += 1
         return {
             "action": "add_borrow",
             "account_id": account_id,
@@ -533,12 +668,10 @@ class GearboxSimulator:
         if account.health_factor(self.oracle) >= 1.0:
             raise ValueError("Account is not liquidatable")
 
-        liquidation_penalty = 0.05
-
         total_debt = account.total_debt()
         strategy_value = account.strategy_value_usd(self.oracle)
         collateral_value = account.collateral_value_usd(self.oracle)
-        available_cash_usd = account.available_cash * self.oracle.get_price("USDC")
+        available_cash_usd = account.available_cash * self.oracle.usdc
 
         self.pool.total_borrowed -= account.borrowed_amount
 
@@ -546,11 +679,13 @@ class GearboxSimulator:
             account.strategy.withdraw()
 
         total_available = collateral_value + strategy_value + available_cash_usd
-        penalty_amount = total_debt * liquidation_penalty
+        penalty_amount = total_debt * LIQUIDATION_PENALTY
         remaining_after_penalty = total_available - total_debt - penalty_amount
 
         account.is_liquidated = True
+        self._live_accounts = [a for a in self._live_accounts if a is not account]
 
+        self.version += 1
         return {
             "action": "liquidate",
             "account_id": account_id,
@@ -562,51 +697,111 @@ class GearboxSimulator:
         }
 
     def advance_time(self, days: int):
+        if days <= 0:
+            return
+
         blocks = int(days * (self.blocks_per_year / 365))
         self.current_block += blocks
+        self.version += 1
+        if not self._live_accounts:
+            # The clock still moves, but there is nothing to accrue
+            return
+
+        # Same rate for every account over the period, so fold it into one factor
+        year_fraction = days / 365
+        interest_factor = self.pool.effective_borrow_rate() * year_fraction
+        # One timestamp for the whole step rather than one per account
+        now = datetime.now()
+        for account in self._live_accounts:
+            account.accrued_interest += account.borrowed_amount * interest_factor
+
+            strategy = account.strategy
+            # Inlined YearnVaultStrategy.accrue_yield
+            if strategy is not None and strategy.deposited_amount:
+                yield_amount = (
+                    strategy.deposited_amount * strategy.yield_apy * year_fraction
+                )
+                strategy.deposited_amount += yield_amount
+                strategy.rewards += yield_amount
+                strategy.last_update = now
 
-        borrow_rate = self.pool.effective_borrow_rate()
-        for account in self.credit_accounts.values():
-            if account.is_liquidated:
-                continue
-
-            interest = account.borrowed_amount * (borrow_rate / 365) * days
-            account.accrued_interest += interest
-
-            if account.strategy:
-                account.strategy.accrue_yield(days)
-
-            account.last_update = datetime.now()
+            account.last_update = now
 
     def simulate_price_drop(self, percent: float, asset: str = "USDC"):
         """Drop price by given percentage for specific asset"""
-        self.oracle.prices[asset] *= 1 - percent / 100
+        self.oracle.set_price(
+            asset, self.oracle.get_price(asset) * (1 - percent / 100)
+        )
+        self.version += 1
 
     def revert_price(self, asset: str):
         """Revert asset price to original (USDC=1.0, ETH=3000.0)"""
-        original_prices = {"USDC": 1.0, "ETH": 3000.0}
-        if asset in original_prices:
-            self.oracle.prices[asset] = original_prices[asset]
+        if asset in INITIAL_PRICES:
+            self.oracle.set_price(asset, INITIAL_PRICES[asset])
+            self.version += 1
+
+    def _valued_accounts(
+        self,
+    ) -> Iterator[Tuple[CreditAccount, float, float, float, float, float]]:
+        """Yield (account, deposited, collateral_usd, strategy_usd, total_debt,
+        health_factor) for every live account, pricing each one once"""
+        oracle = self.oracle
+        # Prices are fixed for the whole pass, so read them once
+        eth_price = oracle.eth
+        usdc_price = oracle.usdc
+        for ca in self._live_accounts:
+            # Same arithmetic as the *_value_usd methods
+            deposited = ca.strategy.deposited_amount if ca.strategy else 0
+            collateral_usd = (
+                ca.collateral_eth * eth_price + ca.collateral_usdc * usdc_price
+            )
+            strategy_usd = deposited * usdc_price
+            total_debt = ca.borrowed_amount + ca.accrued_interest
+            debt_usd = total_debt * oracle.get_price(ca.borrowed_asset)
+            hf = ca._health_factor(collateral_usd, strategy_usd, debt_usd, usdc_price)
+            yield ca, deposited, collateral_usd, strategy_usd, total_debt, hf
+
+    def scan_liquidatable(self) -> List[str]:
+        """Ids of all live accounts with HF < 1.0, found in a single pass"""
+        return [ca.account_id for ca, *_, hf in self._valued_accounts() if hf < 1.0]
 
     def get_all_accounts(self) -> List[Dict]:
-        return [
-            {
-                "account_id": ca.account_id,
-                "owner": ca.owner,
-                "collateral_value_usd": ca.collateral_value_usd(self.oracle),
-                "borrowed_principal": ca.borrowed_amount,
-                "total_debt": ca.total_debt(),
-                "deposited_amount": ca.strategy.deposited_amount if ca.strategy else 0,
-                "strategy_value_usd": ca.strategy_value_usd(self.oracle),
-                "rewards": ca.strategy.rewards if ca.strategy else 0,
-                "health_factor": ca.health_factor(self.oracle),
-                "status": ca.status(self.oracle).value,
-                "is_liquidated": ca.is_liquidated,
-                "available_cash": ca.available_cash,
-            }
-            for ca in self.credit_accounts.values()
-            if not ca.is_liquidated
-        ]
+        """Rows for every live account. The list is reused until the next
+        change to the simulator, so callers must not modify it."""
+        snapshot = self._accounts_snapshot
+        if snapshot is not None and snapshot[0] == self.version:
+            return snapshot[1]
+
+        accounts = []
+        for ca, deposited, collateral_usd, strategy_usd, total_debt, hf in (
+            self._valued_accounts()
+        ):
+            status = _STATUS_STRS[_status_code(hf)]
+            available = ca.available_cash
+            accounts.append(
+                {
+                    "account_id": ca.account_id,
+                    "owner": ca.owner,
+                    "collateral_value_usd": collateral_usd,
+                    "borrowed_principal": ca.borrowed_amount,
+                    "accrued_interest": ca.accrued_interest,
+                    "total_debt": total_debt,
+                    "deposited_amount": deposited,
+                    "strategy_value_usd": strategy_usd,
+                    "rewards": ca.strategy.rewards if ca.strategy else 0,
+                    "health_factor": hf,
+                    "status": status,
+                    "is_liquidated": ca.is_liquidated,
+                    "available_cash": available,
+                    # Which UI actions the account currently allows
+                    "can_deploy": available > 0,
+                    "can_repay": ca.borrowed_amount != 0 and available >= total_debt,
+                    "can_withdraw": deposited > 0 and strategy_usd > 0,
+                    "can_liquidate": status == "liquidatable",
+                }
+            )
+        self._accounts_snapshot = (self.version, accounts)
+        return accounts
 
     def get_elapsed_days(self) -> float:
         return (self.current_block / self.blocks_per_year) * 365
@@ -625,22 +820,278 @@ class GearboxSimulator:
         }
 
 
+_ACCOUNTS_GUIDE_MD = """
+**What are Credit Accounts?**
+
+Open accounts by providing ETH collateral and borrowing USDC. You can then deploy borrowed funds to strategies to earn yield.
+
+**Health Factor Requirements:**
+- **Minimum to Open**: HF ≥ 1.2
+- **Healthy**: HF ≥ 1.2 (safe from liquidation)
+- **At Risk**: HF 1.0-1.2 (monitor closely)
+- **Liquidatable**: HF < 1.0 (can be liquidated)
+
+**Key Terms:**
+- **Collateral**: ETH locked in your account
+- **Borrowed**: USDC principal borrowed from the pool
+- **Debt**: Borrowed amount + accrued interest
+- **Available**: USDC ready to deploy or repay
+
+**Health Factor Formula:**
+```
+HF = (Total Collateral × 0.95) / Total Debt
+```
+- **Total Collateral** = Collateral Value + Strategy Value + Available Cash
+- **Total Debt** = Borrowed Principal + Accrued Interest
+- **0.95** = Liquidation threshold
+"""
+
+
+_STRATEGY_GUIDE_MD = """
+**Strategy Management**: Deploy borrowed USDC to Yearn Vault (8% APY) to earn yield. Strategy value counts as collateral for Health Factor.
+
+- **Deploy**: Move available cash to Yearn strategy to start earning yield
+- **Withdraw**: Remove funds from strategy back to available cash
+- **Repay**: Use available cash to pay down debt (principal + interest)
+- **Available**: USDC ready to deploy or repay (from borrowing or withdrawing)
+"""
+
+
+_LIQ_GUIDE_MD = """
+**Liquidation Risk**: Accounts with Health Factor < 1.0 can be liquidated. Price drops reduce collateral value and increase risk. Monitor **At Risk** accounts (HF 1.0-1.2).
+
+- **Liquidatable** (HF < 1.0): Can be liquidated immediately, 5% penalty applies
+- **At Risk** (HF 1.0-1.2): Close to liquidation threshold, monitor closely
+- **Healthy** (HF ≥ 1.2): Safe from liquidation
+- Use the price controls to simulate market stress and test liquidation scenarios
+"""
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _cached_pool_state(sim_id: str, version: int, _sim: GearboxSimulator) -> Dict:
+    return _sim.get_pool_state()
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _cached_accounts(
+    sim_id: str, version: int, _sim: GearboxSimulator
+) -> List[Dict]:
+    return _sim.get_all_accounts()
+
+
+def _format_table_rows(accounts: List[Dict]) -> List[Dict[str, str]]:
+    """Display strings for the account tables, shared by both sections"""
+    return [
+        {
+            "Account": acc["account_id"],
+            "Collateral": f"${acc['collateral_value_usd']:,.0f}",
+            "Borrowed": f"${acc['borrowed_principal']:,.0f}",
+            "Deposited": f"${acc['deposited_amount']:,.0f}",
+            "Strategy": f"${acc['strategy_value_usd']:,.0f}",
+            "Available": f"${acc['available_cash']:,.0f}",
+            "Rewards": f"${acc['rewards']:.2f}",
+            "Int.": f"${acc['accrued_interest']:.2f}",
+            "HF": f"{acc['health_factor']:.2f}",
+        }
+        for acc in accounts
+    ]
+
+
+def _run_action(run: Callable[..., str], *args) -> None:
+    """Apply a simulator action; used as an on_click callback so it runs
+    before the rerun starts. The outcome is shown at the top of the page by
+    the next full run."""
+    try:
+        st.session_state.setdefault("pending_toasts", []).append(run(*args))
+    except Exception as e:
+        st.session_state.action_error = f"❌ {e}"
+
+
+# (label, button key, row flag that enables it, run(row) -> toast message)
+AccountAction = Tuple[str, str, str, Callable[[Dict], str]]
+
+
+def _render_account_actions(
+    accounts: List[Dict],
+    select_key: str,
+    actions: List[AccountAction],
+):
+    """One account picker plus one button per action, applied to the pick.
+
+    The widget set (and its keys) stays the same however many accounts
+    there are, instead of a button row per account.
+    """
+    by_id = {acc["account_id"]: acc for acc in accounts}
+    picker, *action_cols = st.columns([3] + [1] * len(actions))
+    target = by_id[
+        picker.selectbox(
+            "Account", list(by_id), key=select_key, label_visibility="collapsed"
+        )
+    ]
+    for col, (label, key, flag, run) in zip(action_cols, actions):
+        col.button(
+            label,
+            key=key,
+            use_container_width=True,
+            disabled=not target[flag],
+            on_click=_run_action,
+            args=(run, target),
+        )
+
+
+def _render_account_table(
+    accounts: List[Dict],
+    select_key: str,
+    actions: List[AccountAction],
+):
+    """Read-only account table plus one action row for a picked account"""
+    st.dataframe(
+        _format_table_rows(accounts), use_container_width=True, hide_index=True
+    )
+    _render_account_actions(accounts, select_key, actions)
+
+
+@st.fragment
+def _open_account_fragment(sim: GearboxSimulator):
+    """Open-account inputs and HF preview (reruns on its own while typing)"""
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Collateral**")
+        collateral_asset = st.selectbox(
+            "Asset", ["ETH"], disabled=True, key="col_asset"
+        )
+        collateral_amt = st.number_input(
+            "Amount (ETH)", min_value=0.01, value=5.0, step=0.5, key="col_amt"
+        )
+
+    with col2:
+        st.markdown("**Borrow**")
+        st.text_input("Asset", value="USDC", disabled=True, key="borrow_asset")
+        borrow_amt = st.number_input(
+            "Amount (USDC)",
+            min_value=100.0,
+            value=10000.0,
+            step=100.0,
+            key="borrow_amt",
+        )
+
+    if collateral_amt > 0 and borrow_amt > 0:
+        collateral_usd = collateral_amt * sim.oracle.eth
+        leverage = (collateral_usd + borrow_amt) / collateral_usd
+        temp_account = CreditAccount(
+            account_id="temp",
+            owner="temp",
+            collateral_eth=collateral_amt,
+            borrowed_amount=borrow_amt,
+            borrowed_asset="USDC",
+        )
+        hf = temp_account.health_factor(sim.oracle)
+
+        st.divider()
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Leverage", f"{leverage:.2f}x")
+        c2.metric("Collateral (USD)", f"${collateral_usd:,.0f}")
+        hf_color = "green" if hf >= MIN_HEALTH_FACTOR else "red"
+        c3.markdown(f"**Health Factor:** :{hf_color}[{hf:.3f}]")
+
+        can_open = hf >= MIN_HEALTH_FACTOR
+        if not can_open:
+            st.warning("⚠️ Health factor must be ≥ 1.2 to open account")
+
+        def open_account() -> str:
+            user_addr = "0xuser1"
+            collateral_amt = st.session_state.col_amt
+            if user_addr not in sim.users:
+                sim.create_user(user_addr, eth=collateral_amt * 2)
+            result = sim.borrow(
+                user_addr, collateral_amt, st.session_state.borrow_amt, "ETH"
+            )
+            return f"✅ Account {result['account_id']} opened!"
+
+        # Opening an account changes the sidebar and tables too, so rerun the
+        # whole app rather than just this fragment
+        if st.button(
+            "OPEN ACCOUNT", type="primary", disabled=not can_open, key="btn_open"
+        ):
+            _run_action(open_account)
+            st.rerun()
+
+
+@st.fragment
+def _adjust_account_fragment(sim: GearboxSimulator, acc: Dict):
+    """Add Collateral / Add Borrow inputs for the selected account"""
+    st.markdown("#### Add Collateral")
+    cc1, cc2 = st.columns(2)
+    cc1.number_input(
+        "ETH Amount",
+        min_value=0.01,
+        value=1.0,
+        step=0.5,
+        key="add_collateral_amt",
+    )
+
+    def add_collateral(acc: Dict) -> str:
+        user_addr = acc["owner"]
+        if user_addr not in sim.users:
+            sim.create_user(user_addr, eth=st.session_state.add_collateral_amt * 2)
+        result = sim.add_collateral(
+            user_addr,
+            acc["account_id"],
+            st.session_state.add_collateral_amt,
+            "ETH",
+        )
+        return f"✅ Collateral added! HF: {result['new_hf']:.3f}"
+
+    if cc2.button("Add Collateral", key="btn_add_collateral"):
+        _run_action(add_collateral, acc)
+        st.rerun()
+
+    st.markdown("#### Add Borrow")
+    cb1, cb2 = st.columns(2)
+    cb1.number_input(
+        "USDC Amount",
+        min_value=100.0,
+        value=1000.0,
+        step=100.0,
+        key="add_borrow_amt",
+    )
+
+    def add_borrow(acc: Dict) -> str:
+        user_addr = acc["owner"]
+        if user_addr not in sim.users:
+            sim.create_user(user_addr, usdc=st.session_state.add_borrow_amt * 2)
+        result = sim.add_borrow(
+            user_addr,
+            acc["account_id"],
+            st.session_state.add_borrow_amt,
+        )
+        return f"✅ Borrowed! HF: {result['new_hf']:.3f}"
+
+    if cb2.button("Add Borrow", key="btn_add_borrow"):
+        _run_action(add_borrow, acc)
+        st.rerun()
+
+
 def main():
     st.set_page_config(
         page_title="Gearbox Protocol Simulator", page_icon="⚙️", layout="wide"
     )
 
     st.title("⚙️ Gearbox Protocol Simulator")
-    strategy_apy = YearnVaultStrategy().yield_apy
     st.caption(
-        f"Borrow USDC, deploy to Yearn ({strategy_apy*100:.1f}% APY), monitor health factors"
+        f"Borrow USDC, deploy to Yearn ({YEARN_APY*100:.1f}% APY), monitor health factors"
     )
 
+    for msg in st.session_state.pop("pending_toasts", []):
+        st.toast(msg)
+    if "action_error" in st.session_state:
+        st.error(st.session_state.pop("action_error"))
+
     if "simulator" not in st.session_state:
         st.session_state.simulator = GearboxSimulator()
 
     sim = st.session_state.simulator
-    pool_state = sim.get_pool_state()
+    pool_state = _cached_pool_state(sim.sim_id, sim.version, sim)
 
     st.sidebar.markdown("### Pool (USDC)")
     st.sidebar.metric("Liquidity", f"${pool_state['total_liquidity']:,.0f}")
@@ -653,14 +1104,17 @@ def main():
     days = st.sidebar.number_input(
         "Advance", min_value=1, max_value=365, value=30, key="days_input"
     )
-    if st.sidebar.button("⏭️ Advance"):
-        sim.advance_time(days)
-        st.rerun()
+    st.sidebar.button(
+        "⏭️ Advance",
+        on_click=lambda: sim.advance_time(st.session_state.days_input),
+    )
 
     st.sidebar.markdown("---")
     st.sidebar.markdown("### Wallet")
 
-    accounts = sim.get_all_accounts()
+    # One snapshot for the whole run; actions that change the simulator run
+    # as on_click callbacks or end in a full st.rerun(), so it never goes stale
+    accounts = _cached_accounts(sim.sim_id, sim.version, sim)
     account_ids = [acc["account_id"] for acc in accounts] + ["+ New Account"]
     selected = st.selectbox("Select Account", account_ids, key="select_account")
 
@@ -671,110 +1125,29 @@ def main():
         user_addr = acc["owner"] if acc else "0xuser1"
 
     if user_addr not in sim.users:
-        sim.create_user(user_addr, {"USDC": 50000.0, "ETH": 50.0})
+        sim.create_user(user_addr, usdc=50000.0, eth=50.0)
     user = sim.users[user_addr]
-    st.sidebar.metric("ETH", f"{user.wallet_balance.get('ETH', 0):.2f}")
-    st.sidebar.metric("USDC", f"${user.wallet_balance.get('USDC', 0):,.0f}")
-
-    tab1, tab2, tab3 = st.tabs(["📊 Accounts", "💰 Strategies", "🔥 Liquidations"])
+    st.sidebar.metric("ETH", f"{user.eth:.2f}")
+    st.sidebar.metric("USDC", f"${user.usdc:,.0f}")
+
+    # Unlike st.tabs, only the selected section's body runs on each rerun
+    section = st.radio(
+        "Section",
+        ["📊 Accounts", "💰 Strategies", "🔥 Liquidations"],
+        horizontal=True,
+        key="active_tab",
+        label_visibility="collapsed",
+    )
 
-    with tab1:
+    if section == "📊 Accounts":
         st.subheader("Accounts")
         with st.expander("💡 **Credit Accounts Guide** - Click to expand"):
-            st.markdown(
-                """
-            **What are Credit Accounts?**
-            
-            Open accounts by providing ETH collateral and borrowing USDC. You can then deploy borrowed funds to strategies to earn yield.
-            
-            **Health Factor Requirements:**
-            - **Minimum to Open**: HF ≥ 1.2
-            - **Healthy**: HF ≥ 1.2 (safe from liquidation)
-            - **At Risk**: HF 1.0-1.2 (monitor closely)
-            - **Liquidatable**: HF < 1.0 (can be liquidated)
-            
-            **Key Terms:**
-            - **Collateral**: ETH locked in your account
-            - **Borrowed**: USDC principal borrowed from the pool
-            - **Debt**: Borrowed amount + accrued interest
-            - **Available**: USDC ready to deploy or repay
-            
-            **Health Factor Formula:**
-            ```
-            HF = (Total Collateral × 0.95) / Total Debt
-            ```
-            - **Total Collateral** = Collateral Value + Strategy Value + Available Cash
-            - **Total Debt** = Borrowed Principal + Accrued Interest
-            - **0.95** = Liquidation threshold
-            """
-            )
+            st.markdown(_ACCOUNTS_GUIDE_MD)
 
         if selected == "+ New Account":
             st.markdown("### Open New Account")
 
-            col1, col2 = st.columns(2)
-            with col1:
-                st.markdown("**Collateral**")
-                collateral_asset = st.selectbox(
-                    "Asset", ["ETH"], disabled=True, key="col_asset"
-                )
-                collateral_amt = st.number_input(
-                    "Amount (ETH)", min_value=0.01, value=5.0, step=0.5, key="col_amt"
-                )
-
-            with col2:
-                st.markdown("**Borrow**")
-                st.text_input("Asset", value="USDC", disabled=True, key="borrow_asset")
-                borrow_amt = st.number_input(
-                    "Amount (USDC)",
-                    min_value=100.0,
-                    value=10000.0,
-                    step=100.0,
-                    key="borrow_amt",
-                )
-
-            if collateral_amt > 0 and borrow_amt > 0:
-                collateral_usd = collateral_amt * sim.oracle.get_price("ETH")
-                leverage = (collateral_usd + borrow_amt) / collateral_usd
-                temp_account = CreditAccount(
-                    account_id="temp",
-                    owner="temp",
-                    collateral={"ETH": collateral_amt},
-                    borrowed_amount=borrow_amt,
-                    borrowed_asset="USDC",
-                )
-                hf = temp_account.health_factor(sim.oracle)
-
-                st.divider()
-                c1, c2, c3 = st.columns(3)
-                c1.metric("Leverage", f"{leverage:.2f}x")
-                c2.metric("Collateral (USD)", f"${collateral_usd:,.0f}")
-                hf_color = "green" if hf >= 1.2 else "red"
-                c3.markdown(f"**Health Factor:** :{hf_color}[{hf:.3f}]")
-
-                can_open = hf >= 1.2
-                if not can_open:
-                    st.warning("⚠️ Health factor must be ≥ 1.2 to open account")
-
-                if st.button(
-                    "OPEN ACCOUNT",
-                    type="primary",
-                    disabled=not can_open,
-                    key="btn_open",
-                ):
-                    user_addr = "0xuser1"
-                    if user_addr not in sim.users:
-                        sim.create_user(
-                            user_addr, {"USDC": 0.0, "ETH": collateral_amt * 2}
-                        )
-                    try:
-                        result = sim.borrow(
-                            user_addr, collateral_amt, borrow_amt, "ETH"
-                        )
-                        st.toast(f"✅ Account {result['account_id']} opened!")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"❌ {e}")
+            _open_account_fragment(sim)
         else:
             acc = next((a for a in accounts if a["account_id"] == selected), None)
             if acc:
@@ -787,249 +1160,90 @@ def main():
                 c3.metric("Debt", f"${acc['total_debt']:,.0f}")
                 c4.metric("HF", f"{acc['health_factor']:.3f}")
 
-                st.markdown("#### Add Collateral")
-                cc1, cc2 = st.columns(2)
-                cc1.number_input(
-                    "ETH Amount",
-                    min_value=0.01,
-                    value=1.0,
-                    step=0.5,
-                    key="add_collateral_amt",
-                )
-                if cc2.button("Add Collateral", key="btn_add_collateral"):
-                    user_addr = acc["owner"]
-                    if user_addr not in sim.users:
-                        sim.create_user(
-                            user_addr,
-                            {
-                                "USDC": 0.0,
-                                "ETH": st.session_state.add_collateral_amt * 2,
-                            },
-                        )
-                    try:
-                        result = sim.add_collateral(
-                            user_addr,
-                            acc["account_id"],
-                            st.session_state.add_collateral_amt,
-                            "ETH",
-                        )
-                        st.toast(f"✅ Collateral added! HF: {result['new_hf']:.3f}")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"❌ {e}")
-
-                st.markdown("#### Add Borrow")
-                cb1, cb2 = st.columns(2)
-                cb1.number_input(
-                    "USDC Amount",
-                    min_value=100.0,
-                    value=1000.0,
-                    step=100.0,
-                    key="add_borrow_amt",
-                )
-                if cb2.button("Add Borrow", key="btn_add_borrow"):
-                    user_addr = acc["owner"]
-                    if user_addr not in sim.users:
-                        sim.create_user(
-                            user_addr,
-                            {"USDC": st.session_state.add_borrow_amt * 2, "ETH": 0.0},
-                        )
-                    try:
-                        result = sim.add_borrow(
-                            user_addr,
-                            acc["account_id"],
-                            st.session_state.add_borrow_amt,
-                        )
-                        st.toast(f"✅ Borrowed! HF: {result['new_hf']:.3f}")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"❌ {e}")
+                _adjust_account_fragment(sim, acc)
 
         st.divider()
         st.subheader("All Accounts")
 
-        accounts = sim.get_all_accounts()
         if not accounts:
             st.info("No accounts yet.")
         else:
-            c1, c2, c3, c4, c5, c6, c7, c8, c9, c10, c11 = st.columns(
-                [2, 2, 2, 2, 2, 2, 1, 1, 1, 2, 2]
+            def liquidate(acc: Dict) -> str:
+                sim.liquidate_account(acc["account_id"])
+                return "✅ Liquidated"
+
+            _render_account_table(
+                accounts,
+                "tbl_account",
+                [("Liquidate", "btn_tbl_liquidate", "can_liquidate", liquidate)],
             )
-            c1.write("**Account**")
-            c2.write("**Collateral**")
-            c3.write("**Borrowed**")
-            c4.write("**Deposited**")
-            c5.write("**Strategy**")
-            c6.write("**Available**")
-            c7.write("**Rewards**")
-            c8.write("**Int.**")
-            c9.write("**HF**")
-            c10.write("**")
-            c11.write("**")
-
-            for acc in accounts:
-                account = sim.credit_accounts[acc["account_id"]]
-                collateral = acc["collateral_value_usd"]
-                borrowed = acc["borrowed_principal"]
-                deposited = acc["deposited_amount"]
-                strategy_value = acc["strategy_value_usd"]
-                available = acc["available_cash"]
-                rewards = acc["rewards"]
-                accrued_interest = account.accrued_interest
-
-                c1, c2, c3, c4, c5, c6, c7, c8, c9, c10, c11 = st.columns(
-                    [2, 2, 2, 2, 2, 2, 1, 1, 1, 2, 2]
-                )
-                c1.write(f"**{acc['account_id']}**")
-                c2.write(f"${collateral:,.0f}")
-                c3.write(f"${borrowed:,.0f}")
-                c4.write(f"${deposited:,.0f}")
-                c5.write(f"${strategy_value:,.0f}")
-                c6.write(f"${available:,.0f}")
-                c7.write(f"${rewards:.2f}")
-                c8.write(f"${accrued_interest:.2f}")
-                c9.write(f"{acc['health_factor']:.2f}")
-                if c10.button(
-                    "Liquidate",
-                    key=f"liq_tbl_{acc['account_id']}",
-                    disabled=acc["status"] != "liquidatable",
-                ):
-                    try:
-                        result = sim.liquidate_account(acc["account_id"])
-                        st.toast(f"✅ Liquidated")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"❌ {e}")
-
-    with tab2:
+
+    elif section == "💰 Strategies":
         st.subheader("Strategies")
         with st.expander("💡 **Strategy Management Guide** - Click to expand"):
-            st.markdown(
-                """
-            **Strategy Management**: Deploy borrowed USDC to Yearn Vault (8% APY) to earn yield. Strategy value counts as collateral for Health Factor.
-            
-            - **Deploy**: Move available cash to Yearn strategy to start earning yield
-            - **Withdraw**: Remove funds from strategy back to available cash
-            - **Repay**: Use available cash to pay down debt (principal + interest)
-            - **Available**: USDC ready to deploy or repay (from borrowing or withdrawing)
-            """
-            )
+            st.markdown(_STRATEGY_GUIDE_MD)
 
-        accounts = sim.get_all_accounts()
         if not accounts:
             st.info("No accounts yet. Open one in the first tab.")
         else:
-            c1, c2, c3, c4, c5, c6, c7, c8, c9, c10, c11, c12 = st.columns(12)
-            c1.write("**Account**")
-            c2.write("**Collateral**")
-            c3.write("**Borrowed**")
-            c4.write("**Deposited**")
-            c5.write("**Strategy**")
-            c6.write("**Available**")
-            c7.write("**Rewards**")
-            c8.write("**Int.**")
-            c9.write("**HF**")
-            c10.write("**")
-            c11.write("**")
-            c12.write("**")
-
-            for acc in accounts:
-                account = sim.credit_accounts[acc["account_id"]]
-                collateral = acc["collateral_value_usd"]
-                borrowed = acc["borrowed_principal"]
-                deposited = acc["deposited_amount"]
-                strategy_value = acc["strategy_value_usd"]
-                available = acc["available_cash"]
-                rewards = acc["rewards"]
-                accrued_interest = account.accrued_interest
-
-                c1, c2, c3, c4, c5, c6, c7, c8, c9, c10, c11, c12 = st.columns(12)
-                c1.write(f"**{acc['account_id']}**")
-                c2.write(f"${collateral:,.0f}")
-                c3.write(f"${borrowed:,.0f}")
-                c4.write(f"${deposited:,.0f}")
-                c5.write(f"${strategy_value:,.0f}")
-                c6.write(f"${available:,.0f}")
-                c7.write(f"${rewards:.2f}")
-                c8.write(f"${accrued_interest:.2f}")
-                c9.write(f"{acc['health_factor']:.2f}")
-                if c10.button(
-                    "Deploy",
-                    key=f"d_{acc['account_id']}",
-                    use_container_width=True,
-                    disabled=available <= 0,
-                ):
-                    try:
-                        sim.deploy_to_strategy(acc["owner"], acc["account_id"])
-                        st.toast("✅ Deployed to Yearn")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"❌ {e}")
-                total_debt = borrowed + accrued_interest
-                if c11.button(
-                    "Repay",
-                    key=f"r_{acc['account_id']}",
-                    use_container_width=True,
-                    disabled=acc["borrowed_principal"] == 0 or available < total_debt,
-                ):
-                    try:
-                        result = sim.repay_debt(acc["owner"], acc["account_id"])
-                        st.toast(
-                            f"✅ Repaid ${result['debt_repaid']:,.0f} | Available: ${result['available_remaining']:,.0f}"
-                        )
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"❌ {e}")
-                if c12.button(
-                    "Withdraw",
-                    key=f"c_{acc['account_id']}",
-                    use_container_width=True,
-                    disabled=deposited <= 0 or strategy_value <= 0,
-                ):
-                    try:
-                        result = sim.withdraw_from_strategy(
-                            acc["owner"], acc["account_id"]
-                        )
-                        st.toast(f"✅ ${result['amount_withdrawn']:,.0f}")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"❌ {e}")
-
-            st.markdown("---")
-    with tab3:
+            def deploy(acc: Dict) -> str:
+                sim.deploy_to_strategy(acc["owner"], acc["account_id"])
+                return "✅ Deployed to Yearn"
+
+            def repay(acc: Dict) -> str:
+                result = sim.repay_debt(acc["owner"], acc["account_id"])
+                return f"✅ Repaid ${result['debt_repaid']:,.0f} | Available: ${result['available_remaining']:,.0f}"
+
+            def withdraw(acc: Dict) -> str:
+                result = sim.withdraw_from_strategy(acc["owner"], acc["account_id"])
+                return f"✅ ${result['amount_withdrawn']:,.0f}"
+
+            _render_account_table(
+                accounts,
+                "strategy_account",
+                [
+                    ("Deploy", "btn_deploy", "can_deploy", deploy),
+                    ("Repay", "btn_repay", "can_repay", repay),
+                    ("Withdraw", "btn_withdraw", "can_withdraw", withdraw),
+                ],
+            )
+
+    else:
         st.subheader("Liquidations")
         with st.expander("⚠️ **Liquidation Risk Guide** - Click to expand"):
-            st.markdown(
-                """
-            **Liquidation Risk**: Accounts with Health Factor < 1.0 can be liquidated. Price drops reduce collateral value and increase risk. Monitor **At Risk** accounts (HF 1.0-1.2).
-            
-            - **Liquidatable** (HF < 1.0): Can be liquidated immediately, 5% penalty applies
-            - **At Risk** (HF 1.0-1.2): Close to liquidation threshold, monitor closely
-            - **Healthy** (HF ≥ 1.2): Safe from liquidation
-            - Use price drop buttons to simulate market stress and test liquidation scenarios
-            """
+            st.markdown(_LIQ_GUIDE_MD)
+
+        def apply_price_change():
+            asset = st.session_state.price_asset
+            if st.session_state.price_action == "📉 Drop 10%":
+                sim.simulate_price_drop(10, asset)
+            else:
+                sim.revert_price(asset)
+
+        # One submit per price change instead of four buttons
+        with st.form("price_ctrl"):
+            pc1, pc2, pc3 = st.columns(3)
+            pc1.selectbox("Asset", ["USDC", "ETH"], key="price_asset")
+            pc2.radio(
+                "Action",
+                ["📉 Drop 10%", "↩️ Restore"],
+                key="price_action",
+                horizontal=True,
             )
-
-        c1, c2, c3, c4 = st.columns(4)
-        if c1.button("📉 DROP 10% USDC"):
-            sim.simulate_price_drop(10, "USDC")
-            st.rerun()
-        if c2.button("↩️ Restore USDC"):
-            sim.revert_price("USDC")
-            st.rerun()
-        if c3.button("📉 DROP 10% ETH"):
-            sim.simulate_price_drop(10, "ETH")
-            st.rerun()
-        if c4.button("↩️ Restore ETH"):
-            sim.revert_price("ETH")
-            st.rerun()
+            pc3.form_submit_button("Apply", on_click=apply_price_change)
 
         st.divider()
 
-        accounts = sim.get_all_accounts()
-        liquidatable = [a for a in accounts if a["status"] == "liquidatable"]
-        at_risk = [a for a in accounts if a["status"] == "at_risk"]
-        healthy = [a for a in accounts if a["status"] == "healthy"]
+        by_status: Dict[str, List[Dict]] = {
+            "liquidatable": [],
+            "at_risk": [],
+            "healthy": [],
+        }
+        for acc in accounts:
+            by_status[acc["status"]].append(acc)
+        liquidatable = by_status["liquidatable"]
+        at_risk = by_status["at_risk"]
+        healthy = by_status["healthy"]
 
         st.markdown(
             f"**Accounts:** {len(healthy)} ✅  |  {len(at_risk)} ⚠️  |  {len(liquidatable)} 🔥"
@@ -1039,25 +1253,40 @@ def main():
             st.error(
                 f"**{acc['account_id']}** | HF: {acc['health_factor']:.3f} | Debt: ${acc['total_debt']:,.0f}"
             )
-            if st.button("Liquidate", key=f"liq_{acc['account_id']}"):
-                try:
-                    result = sim.liquidate_account(acc["account_id"])
-                    st.success(
-                        f"✅ Liquidated | Penalty: ${result['liquidation_penalty']:,.0f}"
-                    )
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"❌ {e}")
+
+        if liquidatable:
+
+            def liquidate_with_penalty(acc: Dict) -> str:
+                result = sim.liquidate_account(acc["account_id"])
+                return (
+                    f"✅ Liquidated | Penalty: ${result['liquidation_penalty']:,.0f}"
+                )
+
+            _render_account_actions(
+                liquidatable,
+                "liq_account",
+                [("Liquidate", "btn_liq", "can_liquidate", liquidate_with_penalty)],
+            )
 
         for acc in at_risk:
             st.warning(
                 f"**{acc['account_id']}** | HF: {acc['health_factor']:.3f} | Debt: ${acc['total_debt']:,.0f}"
             )
 
-        for acc in healthy:
-            st.info(
-                f"**{acc['account_id']}** | HF: {acc['health_factor']:.3f} | Debt: ${acc['total_debt']:,.0f}"
-            )
+        if healthy:
+            with st.expander(f"✅ Healthy ({len(healthy)})"):
+                st.dataframe(
+                    [
+                        {
+                            "Account": acc["account_id"],
+                            "HF": f"{acc['health_factor']:.3f}",
+                            "Debt": f"${acc['total_debt']:,.0f}",
+                        }
+                        for acc in healthy
+                    ],
+                    use_container_width=True,
+                    hide_index=True,
+                )
 
 
 if __name__ == "__main__":